@@ -2,15 +2,15 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from utils.code_generator import generate_pandas_code
-from LLMAnalyser.config import AVAILABLE_MODULES
+from utils.code_cache import get_cache_stats
+from LLMAnalyser.config import AVAILABLE_MODULES, MAX_CONCURRENT_TEST_CASES
 from LLMAnalyser.test_case_parser import parse_test_cases_from_json
-from LLMAnalyser.syntax_analyser import is_valid_compile
-from LLMAnalyser.logical_analyser import is_valid_logic
-from LLMAnalyser.efficiency_analyser import is_efficient
+from LLMAnalyser.test_runner import run_test_cases_concurrently
+from utils.ingestion import describe_load
+from utils.dataframe_cache import load_cached_csv
 import time
 from styles.main import get_css
 import json
-import spacy
 import streamlit as st
 import subprocess
 import sys
@@ -58,150 +58,35 @@ def get_pdf_download_link(pdf_path):
 
 
 def run_test_cases():
-    """Run all test cases and save results"""
+    """Run all test cases concurrently and save results"""
     if not st.session_state.df is not None:
         st.error("Please upload a CSV file first")
         return
 
-    results = []
     st.session_state.analysis_results = {}
+    test_cases = list(st.session_state.test_cases)
+    active_modules = list(st.session_state.active_modules)
+
+    progress_bar = st.progress(0.0, text=f"Processing {len(test_cases)} test cases...")
+
+    def on_progress(idx, result, completed, total):
+        # Called on the script thread, so session state stays consistent
+        query = test_cases[idx]['query']
+        if result is None:
+            progress_bar.progress(completed / total, text=f"Generated code for: {query}")
+            return
+        st.session_state.analysis_results[f"test_{idx}"] = result["analysis_results"]
+        progress_bar.progress(completed / total, text=f"Analysed: {query}")
+
+    results = run_test_cases_concurrently(
+        test_cases,
+        st.session_state.df,
+        active_modules,
+        max_workers=MAX_CONCURRENT_TEST_CASES,
+        on_progress=on_progress
+    )
+    progress_bar.empty()
 
-    for idx, test_case in enumerate(st.session_state.test_cases):
-        test_id = f"test_{idx}"
-        st.session_state.analysis_results[test_id] = {}
-        
-        with st.spinner(f"Processing query: {test_case['query']}"):
-            try:
-                # Generate code from query
-                generated_code = generate_pandas_code(
-                    test_case['query'], 
-                    st.session_state.df,
-                    context={"df": st.session_state.df}
-                )
-                try:
-                
-                    if generated_code:
-                        namespace = {
-                            'df': st.session_state.df,
-                            'pd': pd,
-                            'np': np,
-                            'result': None
-                        }
-                        
-                        clean_code = '\n'.join(
-                            line for line in generated_code.split('\n')
-                            if line.strip() and not line.strip().startswith('#')
-                        )
-                        exec(clean_code, namespace)
-                        actual_output = namespace.get('result')
-
-                        
-                        # Run each active module's analysis
-                        for module in st.session_state.active_modules:
-                            with st.spinner(f"Running {module['name']} analysis..."):
-                                try:
-                                    if module['id'] == 'syntax':
-                                        analysis_result = is_valid_compile(generated_code,test_case["expected_code"])
-                                        st.session_state.analysis_results[test_id][module['id']] = {
-                                            'name': module['name'],
-                                            'result': analysis_result,
-                                            'timestamp': time.time()
-                                        }
-                                        
-                                        # If syntax check fails, stop further analysis
-                                        if analysis_result['status'] == 'Invalid ❌':
-                                            results.append({
-                                                "query": test_case["query"],
-                                                "expected_code": test_case["expected_code"],
-                                                "generated_code": generated_code,
-                                                "expected_output": test_case["expected_output"],
-                                                "actual_output": "Syntax validation failed",
-                                                "status": "error",
-                                                "analysis_results": {
-                                                    'syntax': {
-                                                        'name': module['name'],
-                                                        'result': analysis_result,
-                                                        'timestamp': time.time()
-                                                    }
-                                                }
-                                            })
-                                            break  # Skip other modules
-                                        
-                                    elif module['id'] == 'logical':
-                                        # Only proceed if syntax check passed
-                                        if 'syntax' in st.session_state.analysis_results[test_id] and \
-                                        st.session_state.analysis_results[test_id]['syntax']['result']['status'] == 'Valid ✅':
-                                            analysis_result = is_valid_logic(
-                                                generated_code,
-                                                test_case["expected_code"] if test_case["expected_code"].strip() else None,
-                                                test_case["expected_output"],
-                                                actual_output,
-                                                st.session_state.df
-                                            )
-                                            st.session_state.analysis_results[test_id][module['id']] = {
-                                                'name': module['name'],
-                                                'result': analysis_result,
-                                                'timestamp': time.time()
-                                            }
-                                        
-                                    elif module['id'] == 'efficiency':
-                                        # Only proceed if syntax check passed
-                                        if 'syntax' in st.session_state.analysis_results[test_id] and \
-                                        st.session_state.analysis_results[test_id]['syntax']['result']['status'] == 'Valid ✅':
-                                            analysis_result = is_efficient(
-                                                generated_code,
-                                                test_case["expected_code"] if test_case["expected_code"].strip() else None,
-                                                st.session_state.df
-                                            )
-                                            st.session_state.analysis_results[test_id][module['id']] = {
-                                                'name': module['name'],
-                                                'result': analysis_result,
-                                                'timestamp': time.time()
-                                            }
-                                            
-                                except Exception as e:
-                                    st.session_state.analysis_results[test_id][module['id']] = {
-                                        'name': module['name'],
-                                        'error': str(e),
-                                        'timestamp': time.time()
-                                    }
-                    
-                    # Execute generated code
-                    
-                        
-                        # Save results
-                        results.append({
-                            "query": test_case["query"],
-                            "expected_code": test_case["expected_code"],
-                            "generated_code": generated_code,
-                            "expected_output": test_case["expected_output"],
-                            "actual_output": actual_output,
-                            "status": "success",
-                            "analysis_results": st.session_state.analysis_results[test_id]
-                        })
-                        
-                except Exception as e:
-                    results.append({
-                        "query": test_case["query"],
-                        "expected_code": test_case["expected_code"],
-                        "generated_code": generated_code,
-                        "expected_output": test_case["expected_output"],
-                        "actual_output": f"Error: {str(e)}",
-                        "status": "error",
-                        "analysis_results": st.session_state.analysis_results[test_id]
-                    })
-                
-            except Exception as e:
-                results.append({
-                    "query": test_case["query"],
-                    "expected_code": test_case["expected_code"],
-                    "generated_code": "Failed to generate code",
-                    "expected_output": test_case["expected_output"],
-                    "actual_output": f"Error: {str(e)}",
-                    "status": "error",
-                    "analysis_results": st.session_state.analysis_results[test_id]
-                })
-    
     return results
 
 def render_test_cases():
@@ -469,6 +354,7 @@ def calculate_overall_score(analysis_results: dict) -> dict:
         'syntax': 0.3,
         'logical': 0.4,
         'efficiency': 0.3, 
+        'antipattern': 0.2,
     }
     
     module_scores = {}
@@ -507,6 +393,11 @@ def calculate_overall_score(analysis_results: dict) -> dict:
                 50 if len(result['comparison']['notes']) <= 1 else 30
             )
             module_scores[module_id] = score * weight
+
+        elif module_id == 'antipattern':
+            # Each finding deducts its estimated cost
+            score = 100 - result['estimated_cost']
+            module_scores[module_id] = score * weight
         
         total_score += module_scores[module_id]
     
@@ -578,8 +469,9 @@ def main():
         uploaded_file = st.file_uploader("Select CSV file", type="csv")
         
         if uploaded_file is not None:
-            df = pd.read_csv(uploaded_file)
+            df, load_stats, _ = load_cached_csv(uploaded_file)
             st.session_state.df = df
+            st.caption(describe_load(load_stats))
             
             # Clean data preview
             with st.expander(f"### Data Preview (Top 5)", expanded=False):
@@ -659,6 +551,12 @@ def main():
                     </div>
                 """, unsafe_allow_html=True)
 
+                cache_stats = get_cache_stats()
+                st.caption(
+                    f"Code cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                    f"({cache_stats['hit_rate']:.0%} hit rate)"
+                )
+
                 st.markdown("---")
                 st.markdown("### Download Report")
                 if st.button("Generate PDF Report"):
@@ -886,7 +784,7 @@ def main():
                                                 st.info(f"Overall Similarity: {similarity['overall_similarity']}")
                                                 
                                                 # Display metrics in columns
-                                                metric_cols = st.columns(3)
+                                                metric_cols = st.columns(4)
                                                 metrics = similarity["metrics"]
                                                 
                                                 with metric_cols[0]:
@@ -899,11 +797,18 @@ def main():
                                                 with metric_cols[1]:
                                                     st.metric(
                                                         "BLEU Score",
-                                                        f"{metrics['BLEU Score (spaCy)']:.2f}",
-                                                        help="Text similarity score (higher is better)"
+                                                        f"{metrics['BLEU Score']:.2f}",
+                                                        help="1-4 gram overlap of Python tokens (higher is better)"
                                                     )
                                                 
                                                 with metric_cols[2]:
+                                                    st.metric(
+                                                        "AST Similarity",
+                                                        f"{metrics['AST Similarity']:.2f}",
+                                                        help="Share of matching syntax subtrees (higher is better)"
+                                                    )
+                                                
+                                                with metric_cols[3]:
                                                     st.metric(
                                                         "Cosine Similarity",
                                                         f"{metrics['Cosine Similarity']:.2f}",
@@ -930,6 +835,19 @@ def main():
                                                 with col2:
                                                     if 'test_code' in efficiency_result:
                                                         st.info(f"Expected Code: {efficiency_result['test_code']['time_complexity']}")
+
+                                                scaling = efficiency_result['generated_code'].get('scaling')
+                                                if scaling and scaling.get('sizes'):
+                                                    measured = ", ".join(
+                                                        f"{rows:,} rows: {seconds:.4f}s"
+                                                        for rows, seconds in zip(scaling['sizes'], scaling['times'])
+                                                    )
+                                                    st.caption(f"Measured on row-sampled data — {measured}")
+                                                    if scaling.get('projected_seconds') is not None:
+                                                        st.caption(
+                                                            f"Projected at {scaling['projected_rows']:,} rows: "
+                                                            f"{scaling['projected_seconds']:.2f}s"
+                                                        )
                                                 
                                                 # Display execution metrics
                                                 st.markdown("**Performance Metrics:**")
@@ -949,12 +867,55 @@ def main():
                                                         "Memory Usage", 
                                                         efficiency_result['generated_code']['memory_usage']
                                                     )
+
+                                                timing = efficiency_result['generated_code'].get('timing')
+                                                if timing:
+                                                    st.caption(
+                                                        f"Median of {timing['runs']} runs: {timing['median']:.6f} sec "
+                                                        f"(min {timing['min']:.6f}, p95 {timing['p95']:.6f}, "
+                                                        f"±{timing['rel_ci']:.1%} at 95% confidence)"
+                                                    )
+
+                                                memory_profile = efficiency_result['generated_code'].get('memory_profile')
+                                                if memory_profile:
+                                                    st.caption(
+                                                        f"NumPy buffers: {memory_profile['numpy_buffer_bytes'] / 1024:.2f} KB · "
+                                                        f"Python objects: {memory_profile['python_object_bytes'] / 1024:.2f} KB · "
+                                                        f"Arrow: {(memory_profile['arrow_peak_bytes'] or 0) / 1024:.2f} KB"
+                                                    )
+                                                    if memory_profile['hot_spots']:
+                                                        st.markdown("**Memory Hot Spots:**")
+                                                        st.dataframe(pd.DataFrame(memory_profile['hot_spots']), hide_index=True)
                                                 
                                                 # Display comparison notes
                                                 if efficiency_result["comparison"]["notes"]:
                                                     st.markdown("**Optimization Notes:**")
                                                     for note in efficiency_result["comparison"]["notes"]:
                                                         st.warning(note)
+
+                                            elif module_id == 'antipattern':
+                                                antipattern_result = analysis["result"]
+                                                status_color = "#00ff00" if antipattern_result["status"] == "Valid ✅" else (
+                                                    "#ffa500" if antipattern_result["status"] == "Warning ⚠️" else "#ff0000"
+                                                )
+                                                st.markdown(f"""
+                                                    <div style="
+                                                        padding: 10px;
+                                                        border-radius: 5px;
+                                                        border-left: 5px solid {status_color};
+                                                        background-color: {status_color}11;
+                                                        margin-bottom: 15px;
+                                                    ">
+                                                        <strong>Status:</strong> {antipattern_result["status"]}<br>
+                                                        {antipattern_result["message"]}
+                                                    </div>
+                                                """, unsafe_allow_html=True)
+
+                                                for finding in antipattern_result["findings"]:
+                                                    st.warning(
+                                                        f"Line {finding['line']}: **{finding['title']}** — "
+                                                        f"{finding['estimated_cost']}\n\n{finding['suggestion']}"
+                                                    )
                                 
                         # Code comparison in tabs
                         st.markdown("##### Code & Output")
@@ -0,0 +1,245 @@
+import ast
+from typing import Dict, Any, List
+
+# Ceiling of the summed cost_score; the overall score deducts it from 100
+MAX_ESTIMATED_COST = 100
+
+# Known pandas anti-patterns with a rough cost relative to the idiomatic form.
+# cost_score feeds the overall estimate: it is the points deducted per finding.
+ANTIPATTERNS = {
+    "iterrows": {
+        "title": "Row iteration with iterrows/itertuples",
+        "severity": "high",
+        "cost": "~100-1000x slower than a vectorized column operation",
+        "cost_score": 40,
+        "suggestion": "Use vectorized column arithmetic, boolean masks or groupby instead of looping over rows"
+    },
+    "apply_axis1": {
+        "title": "Row-wise apply(axis=1)",
+        "severity": "high",
+        "cost": "~50-100x slower than column operations; calls Python once per row",
+        "cost_score": 35,
+        "suggestion": "Combine whole columns directly (e.g. df['a'] * df['b']) or use np.where/np.select"
+    },
+    "grow_in_loop": {
+        "title": "append/concat inside a loop",
+        "severity": "high",
+        "cost": "O(n²) copying: every iteration copies the whole frame",
+        "cost_score": 40,
+        "suggestion": "Collect pieces in a list and call pd.concat once after the loop"
+    },
+    "scalar_index_loop": {
+        "title": "Scalar .loc/.iloc/.at access inside a loop",
+        "severity": "medium",
+        "cost": "~10-100x slower than selecting the whole column at once",
+        "cost_score": 20,
+        "suggestion": "Select or assign whole columns/slices instead of one cell per iteration"
+    },
+    "chained_assignment": {
+        "title": "Chained indexing assignment",
+        "severity": "medium",
+        "cost": "Assigns into a temporary copy: an extra copy and possibly no effect on df",
+        "cost_score": 20,
+        "suggestion": "Use a single .loc[row_selector, column] assignment"
+    },
+    "chained_indexing": {
+        "title": "Chained indexing",
+        "severity": "low",
+        "cost": "Materialises an intermediate frame before selecting from it",
+        "cost_score": 5,
+        "suggestion": "Use a single .loc[row_selector, columns] selection"
+    },
+    "repeated_groupby": {
+        "title": "Repeated groupby on the same key",
+        "severity": "medium",
+        "cost": "Re-hashes the key column for every call",
+        "cost_score": 15,
+        "suggestion": "Group once and compute all aggregations with .agg(...)"
+    },
+    "python_string_op": {
+        "title": "Python-level string operation via apply/map",
+        "severity": "medium",
+        "cost": "~5-20x slower than the .str accessor",
+        "cost_score": 15,
+        "suggestion": "Use the vectorized .str accessor (e.g. .str.lower(), .str.contains())"
+    }
+}
+
+STRING_METHODS = {
+    "lower", "upper", "strip", "lstrip", "rstrip", "title", "capitalize", "replace",
+    "split", "startswith", "endswith", "find", "zfill", "casefold", "swapcase", "len"
+}
+SCALAR_INDEXERS = {"loc", "iloc", "at", "iat"}
+LOOP_NODES = (ast.For, ast.While, ast.AsyncFor, ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+
+def _is_axis_one(call: ast.Call) -> bool:
+    for keyword in call.keywords:
+        if keyword.arg == "axis" and isinstance(keyword.value, ast.Constant) and \
+           keyword.value.value in (1, "columns"):
+            return True
+    return False
+
+
+def _is_string_lambda(node: ast.AST) -> bool:
+    """lambda x: x.lower() / len(x) style functions, or str.lower passed directly"""
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "str":
+        return node.attr in STRING_METHODS
+    if isinstance(node, ast.Name) and node.id == "len":
+        return True
+    if not isinstance(node, ast.Lambda) or len(node.args.args) != 1:
+        return False
+    arg = node.args.args[0].arg
+    body = node.body
+    if isinstance(body, ast.Call):
+        func = body.func
+        if isinstance(func, ast.Attribute) and func.attr in STRING_METHODS and \
+           isinstance(func.value, ast.Name) and func.value.id == arg:
+            return True
+        if isinstance(func, ast.Name) and func.id == "len" and body.args and \
+           isinstance(body.args[0], ast.Name) and body.args[0].id == arg:
+            return True
+    return False
+
+
+class _AntiPatternVisitor(ast.NodeVisitor):
+    def __init__(self):
+        self.findings = []
+        self.loop_depth = 0
+        self.groupby_calls = {}
+
+    def _add(self, pattern: str, node: ast.AST, detail: str = None):
+        info = ANTIPATTERNS[pattern]
+        self.findings.append({
+            "pattern": pattern,
+            "title": info["title"],
+            "line": getattr(node, "lineno", None),
+            "severity": info["severity"],
+            "estimated_cost": info["cost"],
+            "cost_score": info["cost_score"],
+            "detail": detail or ast.unparse(node)[:120],
+            "suggestion": info["suggestion"]
+        })
+
+    def _visit_loop(self, node):
+        self.loop_depth += 1
+        self.generic_visit(node)
+        self.loop_depth -= 1
+
+    visit_For = _visit_loop
+    visit_While = _visit_loop
+    visit_AsyncFor = _visit_loop
+    visit_ListComp = _visit_loop
+    visit_SetComp = _visit_loop
+    visit_DictComp = _visit_loop
+    visit_GeneratorExp = _visit_loop
+
+    def visit_Call(self, node: ast.Call):
+        func = node.func
+        if isinstance(func, ast.Attribute):
+            if func.attr in ("iterrows", "itertuples"):
+                self._add("iterrows", node)
+
+            elif func.attr == "apply" and _is_axis_one(node):
+                self._add("apply_axis1", node)
+
+            elif func.attr in ("apply", "map", "applymap") and node.args and _is_string_lambda(node.args[0]):
+                self._add("python_string_op", node)
+
+            elif func.attr == "groupby":
+                key = (ast.unparse(func.value), ast.dump(node.args[0]) if node.args else
+                       ast.dump(node.keywords[0].value) if node.keywords else "")
+                self.groupby_calls.setdefault(key, []).append(node)
+
+            if self.loop_depth and func.attr == "concat":
+                self._add("grow_in_loop", node)
+            elif self.loop_depth and func.attr in ("append", "_append") and \
+                 isinstance(func.value, ast.Name) and func.value.id.startswith("df"):
+                self._add("grow_in_loop", node)
+
+        self.generic_visit(node)
+
+    def visit_Assign(self, node: ast.Assign):
+        # x = x.append(...) only makes sense for DataFrames, list.append returns None
+        if self.loop_depth and isinstance(node.value, ast.Call) and \
+           isinstance(node.value.func, ast.Attribute) and node.value.func.attr == "append" and \
+           isinstance(node.value.func.value, ast.Name) and \
+           any(isinstance(t, ast.Name) and t.id == node.value.func.value.id for t in node.targets):
+            self._add("grow_in_loop", node.value)
+
+        for target in node.targets:
+            if isinstance(target, ast.Subscript) and isinstance(target.value, ast.Subscript):
+                self._add("chained_assignment", target)
+        self.generic_visit(node)
+
+    def visit_Subscript(self, node: ast.Subscript):
+        value = node.value
+        if self.loop_depth and isinstance(value, ast.Attribute) and value.attr in SCALAR_INDEXERS:
+            self._add("scalar_index_loop", node)
+        elif isinstance(value, ast.Subscript) and isinstance(node.ctx, ast.Load) and \
+             isinstance(value.value, ast.Name) and not isinstance(value.slice, ast.Slice):
+            self._add("chained_indexing", node)
+        self.generic_visit(node)
+
+    def finish(self):
+        for calls in self.groupby_calls.values():
+            if len(calls) > 1:
+                for call in calls[1:]:
+                    self._add("repeated_groupby", call)
+        self.findings.sort(key=lambda finding: (finding["line"] or 0, -finding["cost_score"]))
+        return self.findings
+
+
+def detect_antipatterns(code: str) -> List[Dict[str, Any]]:
+    """
+    Statically detect pandas performance anti-patterns without executing code.
+    Returns a list of findings, each with its line and estimated cost.
+    """
+    tree = ast.parse(code)
+    visitor = _AntiPatternVisitor()
+    visitor.visit(tree)
+    return visitor.finish()
+
+
+def analyze_antipatterns(code: str) -> Dict[str, Any]:
+    """Run the anti-pattern check and summarise it in the analyser result format"""
+    try:
+        findings = detect_antipatterns(code)
+    except SyntaxError as e:
+        return {
+            "status": "Error ❌",
+            "message": f"Could not parse code: {e.msg} at line {e.lineno}",
+            "findings": [],
+            # Unparseable code earns no anti-pattern credit in the overall score
+            "estimated_cost": MAX_ESTIMATED_COST,
+            "suggestions": ["Fix the syntax error before checking for anti-patterns"]
+        }
+
+    estimated_cost = min(MAX_ESTIMATED_COST, sum(finding["cost_score"] for finding in findings))
+    if not findings:
+        status, message = "Valid ✅", "No known pandas performance anti-patterns found."
+    elif any(finding["severity"] == "high" for finding in findings):
+        status, message = "Invalid ❌", f"Found {len(findings)} pandas anti-pattern(s), including high-cost ones."
+    else:
+        status, message = "Warning ⚠️", f"Found {len(findings)} pandas anti-pattern(s)."
+
+    suggestions = list(dict.fromkeys(finding["suggestion"] for finding in findings))
+    return {
+        "status": status,
+        "message": message,
+        "findings": findings,
+        "estimated_cost": estimated_cost,
+        "suggestions": suggestions or ["Code follows vectorized pandas idioms"]
+    }
+
+
+def analyze(code: str) -> str:
+    """Markdown summary used by the analysis pipeline view"""
+    result = analyze_antipatterns(code)
+    lines = [f"**{result['status']}** {result['message']}"]
+    for finding in result["findings"]:
+        lines.append(
+            f"- Line {finding['line']}: **{finding['title']}** ({finding['severity']}) — "
+            f"{finding['estimated_cost']}. {finding['suggestion']}."
+        )
+    return "\n".join(lines)
@@ -1,3 +1,5 @@
+import os
+
 AVAILABLE_MODULES = {
     "Syntax Analysis": {
         "id": "syntax",
@@ -20,6 +22,13 @@ AVAILABLE_MODULES = {
         "icon": "⚡",
         "color": "#45B7D1"
     },
+    "Anti-pattern Analysis": {
+        "id": "antipattern",
+        "description": "Detects pandas performance anti-patterns without running code",
+        "file": "antipattern_analyser.py",
+        "icon": "🐼",
+        "color": "#A66CFF"
+    },
     "Text Ouput Analysis": {
         "id": "text",
         "description": "Evaluates text correctness and relevance",
@@ -29,3 +38,8 @@ AVAILABLE_MODULES = {
     }
 }
 
+
+# Number of test cases processed in parallel by run_test_cases.
+# Most of the time per case is spent waiting on LLM calls, so this can be
+# set well above the CPU count.
+MAX_CONCURRENT_TEST_CASES = int(os.getenv("MAX_CONCURRENT_TEST_CASES", "4"))
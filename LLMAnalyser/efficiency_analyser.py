@@ -1,11 +1,27 @@
 import ast
 import time
 import sys
+import threading
 import traceback
-import tracemalloc
 from typing import Dict, Any
 import pandas as pd
 import numpy as np
+from utils.execution_pool import (
+    ExecutionError,
+    ExecutionMemoryError,
+    execute_code,
+    benchmark_code,
+    profile_memory_usage,
+    estimate_code_complexity
+)
+from utils.benchmark import compare_timings
+from utils.complexity import CLASS_EXPONENTS
+
+# RSS moves in pages and allocator arenas, so differences below this are noise
+MEMORY_NOISE_FLOOR = 1024 * 1024
+
+# Held around each generated/test timing pair
+_benchmark_lock = threading.Lock()
 
 def count_operations(node: ast.AST) -> int:
     """Count the number of operations in AST to estimate time complexity"""
@@ -33,30 +49,6 @@ def count_operations(node: ast.AST) -> int:
     
     return operations
 
-def measure_execution_time(code: str, sample_size: int = 5) -> float:
-    """Measure average execution time"""
-    times = []
-    namespace = {}
-    
-    for _ in range(sample_size):
-        start_time = time.perf_counter()
-        exec(code, namespace)
-        end_time = time.perf_counter()
-        times.append(end_time - start_time)
-    
-    return sum(times) / len(times)
-
-def measure_memory_usage(code: str) -> int:
-    """Measure peak memory usage"""
-    tracemalloc.start()
-    namespace = {}
-    exec(code, namespace)
-    current, peak = tracemalloc.get_traced_memory()
-    tracemalloc.stop()
-    return peak
-
-
-
 def estimate_complexity(operations: int) -> str:
     """Estimate big O notation based on operation count"""
     if operations <= 5:
@@ -73,51 +65,84 @@ def estimate_complexity(operations: int) -> str:
 
 
 def execute_code_safely(code: str, df: pd.DataFrame) -> Any:
-    """Execute code safely with proper context"""
+    """Execute code in an isolated worker process with time and memory limits"""
     try:
-        # Create namespace with required imports and context
-        namespace = {
-            'df': df,
-            'pd': pd,
-            'np': np,
-            'result': None
-        }
-        
-        # Clean and execute code
-        clean_code = '\n'.join(
-            line for line in code.split('\n')
-            if line.strip() and not line.strip().startswith('#')
-        )
-        exec(clean_code, namespace)
-        return namespace.get('result')
-        
+        return execute_code(code, df)
     except Exception as e:
         raise RuntimeError(f"Error executing code: {str(e)}")
 
-def measure_execution_time(code: str, df: pd.DataFrame, sample_size: int = 5) -> float:
-    """Measure average execution time"""
-    times = []
-    
-    for _ in range(sample_size):
-        start_time = time.perf_counter()
+def measure_execution_time(code: str, df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Benchmark code in an isolated worker with warmup runs, adaptive repeats
+    and GC control. Returns raw run times and median/p95/min statistics.
+    """
+    try:
+        return benchmark_code(code, df)
+    except Exception as e:
+        raise RuntimeError(f"Error measuring execution time: {str(e)}")
+
+def measure_timing_pair(generated_code: str, test_code: str, df: pd.DataFrame):
+    """
+    Benchmark generated and test code back to back while no other benchmark
+    runs, so both are timed under the same CPU contention even when test
+    cases are analysed concurrently. Returns (generated_timing, test_timing,
+    test_error); test_timing is None when there is no test code or it failed.
+    """
+    with _benchmark_lock:
+        generated_timing = measure_execution_time(generated_code, df)
+        if not test_code:
+            return generated_timing, None, None
         try:
-            execute_code_safely(code, df)
+            return generated_timing, measure_execution_time(test_code, df), None
         except Exception as e:
-            raise RuntimeError(f"Error measuring execution time: {str(e)}")
-        end_time = time.perf_counter()
-        times.append(end_time - start_time)
-    
-    return sum(times) / len(times)
+            return generated_timing, None, e
 
-def measure_memory_usage(code: str, df: pd.DataFrame) -> int:
-    """Measure peak memory usage"""
-    tracemalloc.start()
+def measure_memory_usage(code: str, df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Profile memory in an isolated worker, separately from the timing runs.
+    Reports peak RSS growth, NumPy/Arrow buffer bytes, Python object bytes
+    and per-line allocation hot spots.
+    """
+    try:
+        return profile_memory_usage(code, df)
+    except Exception as e:
+        raise RuntimeError(f"Error measuring memory usage: {str(e)}")
+
+def memory_footprint(profile: Dict[str, Any]) -> int:
+    """Single figure used to compare memory: peak RSS growth where available"""
+    if profile.get("peak_rss_delta") is not None:
+        return profile["peak_rss_delta"]
+    return profile["traced_peak_bytes"]
+
+def measure_scaling(code: str, df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Estimate complexity empirically by timing the code on row-sampled copies
+    of df. A worker killed for time counts as a scaling failure; hitting the
+    memory limit leaves the result unknown, since it may be the resampled
+    frame rather than the code that is too large.
+    """
     try:
-        execute_code_safely(code, df)
-        current, peak = tracemalloc.get_traced_memory()
-        return peak
-    finally:
-        tracemalloc.stop()
+        return estimate_code_complexity(code, df)
+    except ExecutionMemoryError as e:
+        return {
+            "class": "N/A",
+            "r_squared": None,
+            "scaling_risk": False,
+            "notes": [f"Scaling run stopped at the memory limit; complexity unknown ({str(e)})"]
+        }
+    except ExecutionError as e:
+        return {
+            "class": "N/A",
+            "r_squared": None,
+            "scaling_risk": True,
+            "notes": [f"Scaling run failed: {str(e)}"]
+        }
+
+def format_complexity(scaling: Dict[str, Any], static_complexity: str) -> str:
+    """Empirical class with its goodness of fit, or the static estimate as a fallback"""
+    if scaling.get("r_squared") is None:
+        return f"{static_complexity} (static estimate)"
+    return f"{scaling['class']} (R²={scaling['r_squared']:.2f})"
 
 def is_efficient(generated_code: str, test_code: str = None, df: pd.DataFrame = None) -> Dict[str, Any]:
     """
@@ -151,21 +176,33 @@ def is_efficient(generated_code: str, test_code: str = None, df: pd.DataFrame =
             generated_ast = ast.parse(generated_code)
             generated_ops = count_operations(generated_ast)
             generated_complexity = estimate_complexity(generated_ops)
-            generated_time = measure_execution_time(generated_code, df)
-            generated_memory = measure_memory_usage(generated_code, df)
+            generated_timing, test_timing, test_timing_error = measure_timing_pair(generated_code, test_code, df)
+            generated_time = generated_timing["stats"]["median"]
+            generated_memory_profile = measure_memory_usage(generated_code, df)
+            generated_memory = memory_footprint(generated_memory_profile)
+            generated_scaling = measure_scaling(generated_code, df)
             
             results = {
                 "generated_code": {
-                    "time_complexity": generated_complexity,
+                    "time_complexity": format_complexity(generated_scaling, generated_complexity),
+                    "static_complexity": generated_complexity,
                     "execution_time": f"{generated_time:.6f} sec",
                     "memory_usage": f"{generated_memory / 1024:.2f} KB",
-                    "operation_count": generated_ops
+                    "operation_count": generated_ops,
+                    "timing": generated_timing["stats"],
+                    "memory_profile": generated_memory_profile,
+                    "scaling": generated_scaling
                 },
                 "comparison": {
                     "is_efficient": True,
                     "notes": []
                 }
             }
+
+            # Flag code that will not survive production-size data
+            if generated_scaling["scaling_risk"]:
+                results["comparison"]["is_efficient"] = False
+                results["comparison"]["notes"].extend(generated_scaling["notes"])
         except Exception as e:
             error_response["error"] = f"Error analyzing generated code: {str(e)}"
             error_response["traceback"] = traceback.format_exc()
@@ -177,14 +214,22 @@ def is_efficient(generated_code: str, test_code: str = None, df: pd.DataFrame =
                 test_ast = ast.parse(test_code)
                 test_ops = count_operations(test_ast)
                 test_complexity = estimate_complexity(test_ops)
-                test_time = measure_execution_time(test_code, df)
-                test_memory = measure_memory_usage(test_code, df)
+                if test_timing_error is not None:
+                    raise test_timing_error
+                test_time = test_timing["stats"]["median"]
+                test_memory_profile = measure_memory_usage(test_code, df)
+                test_memory = memory_footprint(test_memory_profile)
+                test_scaling = measure_scaling(test_code, df)
                 
                 results["test_code"] = {
-                    "time_complexity": test_complexity,
+                    "time_complexity": format_complexity(test_scaling, test_complexity),
+                    "static_complexity": test_complexity,
                     "execution_time": f"{test_time:.6f} seconds",
                     "memory_usage": f"{test_memory / 1024:.2f} KB",
-                    "operation_count": test_ops
+                    "operation_count": test_ops,
+                    "timing": test_timing["stats"],
+                    "memory_profile": test_memory_profile,
+                    "scaling": test_scaling
                 }
                 
                 # Compare and add notes
@@ -194,17 +239,28 @@ def is_efficient(generated_code: str, test_code: str = None, df: pd.DataFrame =
                         "Generated code has significantly more operations"
                     )
                 
-                if generated_time > test_time*2:
+                timing_comparison = compare_timings(generated_timing["times"], test_timing["times"])
+                results["comparison"]["timing"] = timing_comparison
+                if timing_comparison["slower"]:
                     results["comparison"]["is_efficient"] = False
                     results["comparison"]["notes"].append(
-                        "Generated code is significantly slower"
+                        f"Generated code is significantly slower "
+                        f"({timing_comparison['ratio']:.2f}x median, p={timing_comparison['p_value']:.3g})"
                     )
                 
-                if generated_memory > test_memory*2:
+                if generated_memory > max(test_memory * 2, MEMORY_NOISE_FLOOR):
                     results["comparison"]["is_efficient"] = False
                     results["comparison"]["notes"].append(
                         "Generated code uses significantly more memory"
                     )
+
+                if generated_scaling.get("r_squared") is not None and test_scaling.get("r_squared") is not None and \
+                CLASS_EXPONENTS[generated_scaling["class"]] > CLASS_EXPONENTS[test_scaling["class"]]:
+                    results["comparison"]["is_efficient"] = False
+                    results["comparison"]["notes"].append(
+                        f"Generated code scales as {generated_scaling['class']} "
+                        f"while expected code scales as {test_scaling['class']}"
+                    )
             except Exception as e:
                 results["test_code"] = default_metrics
                 results["comparison"]["notes"].append(f"Error analyzing test code: {str(e)}")
@@ -1,9 +1,5 @@
 import difflib
 import numpy as np
-import spacy
-import Levenshtein
-from sklearn.feature_extraction.text import TfidfVectorizer
-from scipy.spatial.distance import cosine
 import google.generativeai as genai
 import json
 import warnings
@@ -14,17 +10,9 @@ import plotly.express as px
 import plotly.graph_objects as go
 
 import streamlit as st
-import subprocess
-import sys
 
-def download_spacy_model():
-    try:
-        nlp = spacy.load('en_core_web_sm')
-    except OSError:
-        subprocess.check_call([sys.executable, "-m", "spacy", "download", "en_core_web_sm"])
-        nlp = spacy.load('en_core_web_sm')
-    return nlp
-nlp = download_spacy_model()
+from utils.execution_pool import execute_code
+from LLMAnalyser.similarity import compute_suite_similarity
 
 warnings.filterwarnings('ignore', message='numpy.dtype size changed')
 warnings.filterwarnings('ignore', message='numpy.ufunc size changed')
@@ -44,22 +32,9 @@ def validate_output(expected_output, generated_output, expected_code, generated_
                 generated_output)
     
     elif str(type(generated_output)).startswith("<class 'pandas"):
-        # Execute expected_code to get the expected DataFrame
-        namespace = {
-            'df': df,
-            'pd': pd,
-            'np': np,
-            'result': None
-        }
-        
-        # Clean and execute code
-        clean_code = '\n'.join(
-            line for line in expected_code.split('\n')
-            if line.strip() and not line.strip().startswith('#')
-        )
+        # Execute expected_code in an isolated worker to get the expected DataFrame
         try:
-            exec(clean_code, namespace)
-            expected_df = namespace.get('result')
+            expected_df = execute_code(expected_code, df)
             if expected_df is None:
                 return ("Error: Expected dataframe not produced", None)
             if generated_output is None:
@@ -73,15 +48,7 @@ def validate_output(expected_output, generated_output, expected_code, generated_
     elif isinstance(generated_output, dict) and 'figure' in generated_output:
         # Handle Plotly figure comparison when output is in dict format
         try:
-            namespace = {
-                'df': df,
-                'pd': pd,
-                'np': np,
-                'result': None
-            }
-            
-            exec(expected_code, namespace)
-            expected_output = namespace.get('result')
+            expected_output = execute_code(expected_code, df)
             
             if expected_output is None:
                 return ("Error: Expected figure not produced", None)
@@ -196,52 +163,16 @@ def validate_code(expected_code, generated_code):
 
 
 
-def tokenize_text(text):
-    """Tokenize text using spaCy."""
-    doc = nlp(text)
-    return [token.text for token in doc if not token.is_punct]  # Exclude punctuation
-
-def calculate_levenshtein_distance(expected_code, generated_code):
-    """Calculate Levenshtein Distance (edit distance) between two code strings."""
-    return Levenshtein.distance(expected_code, generated_code)
-
-def calculate_bleu_score(expected_code, generated_code):
-    """Calculate BLEU Score alternative using spaCy tokenization."""
-    reference_tokens = tokenize_text(expected_code)
-    candidate_tokens = tokenize_text(generated_code)
-
-    # Compute simple overlap score (alternative to BLEU)
-    common_tokens = set(reference_tokens) & set(candidate_tokens)
-    bleu_like_score = len(common_tokens) / len(reference_tokens) if reference_tokens else 0
-
-    return bleu_like_score
-
-def calculate_cosine_similarity(expected_code, generated_code):
-    """Calculate Cosine Similarity between expected and generated code using TF-IDF."""
-    vectorizer = TfidfVectorizer().fit_transform([expected_code, generated_code])
-    vectors = vectorizer.toarray()
-    
-    if np.any(vectors[0]) and np.any(vectors[1]):  # Avoid division by zero
-        return 1 - cosine(vectors[0], vectors[1])  # Cosine Similarity
-    return 0.0
-
 def calculate_similarity_metrics(expected_code, generated_code):
     """Calculate similarity scores using different algorithms."""
-    levenshtein_dist = calculate_levenshtein_distance(expected_code, generated_code)
-    bleu_score = calculate_bleu_score(expected_code, generated_code)
-    cosine_sim = calculate_cosine_similarity(expected_code, generated_code)
-
-    return {
-        "Levenshtein Distance": levenshtein_dist,
-        "BLEU Score (spaCy)": bleu_score,
-        "Cosine Similarity": cosine_sim
-    }
+    return compute_suite_similarity([(expected_code, generated_code)])[0]
 
 def is_valid_logic(generated_code: str, 
                    expected_code: str = None, 
                    expected_output: str = "{}", 
                    generated_output: str = None, 
-                   df: pd.DataFrame = None) -> dict:
+                   df: pd.DataFrame = None,
+                   similarity_metrics: dict = None) -> dict:
     """
     Analyze logical correctness of generated code by comparing with expected code
     using multiple validation approaches.
@@ -249,6 +180,8 @@ def is_valid_logic(generated_code: str,
     Args:
         generated_code (str): The code generated by the system
         expected_code (str, optional): Expected correct code for comparison
+        similarity_metrics (dict, optional): Metrics already computed for this
+            pair by compute_suite_similarity, to skip recomputing them
         
     Returns:
         dict: Analysis results including AI validation and similarity metrics
@@ -275,15 +208,17 @@ def is_valid_logic(generated_code: str,
         results["ai_validation"] = ai_validation
 
         # 2. Calculate similarity metrics
-        similarity_metrics = calculate_similarity_metrics(expected_code, generated_code)
+        if similarity_metrics is None:
+            similarity_metrics = calculate_similarity_metrics(expected_code, generated_code)
         results["similarity_metrics"] = similarity_metrics
 
         # 3. Calculate overall similarity score
         # Weight each metric based on importance
         weights = {
             "Levenshtein Distance": 0.2,
-            "BLEU Score (spaCy)": 0.4,
-            "Cosine Similarity": 0.4
+            "BLEU Score": 0.3,
+            "AST Similarity": 0.2,
+            "Cosine Similarity": 0.3
         }
 
         # Normalize Levenshtein distance (lower is better)
@@ -292,7 +227,8 @@ def is_valid_logic(generated_code: str,
 
         overall_similarity = (
             normalized_levenshtein * weights["Levenshtein Distance"] +
-            similarity_metrics["BLEU Score (spaCy)"] * weights["BLEU Score (spaCy)"] +
+            similarity_metrics["BLEU Score"] * weights["BLEU Score"] +
+            similarity_metrics["AST Similarity"] * weights["AST Similarity"] +
             similarity_metrics["Cosine Similarity"] * weights["Cosine Similarity"]
         )
         results["overall_similarity"] = round(overall_similarity * 100, 2)  # Convert to percentage
@@ -0,0 +1,150 @@
+import ast
+import io
+import math
+import re
+import tokenize
+from collections import Counter
+
+import numpy as np
+import Levenshtein
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+BLEU_MAX_N = 4
+# Chen & Cherry "method 1": zero n-gram matches count as this instead of 0
+BLEU_SMOOTHING_EPSILON = 0.1
+# Depth of the structural signature taken for every AST node
+AST_SIGNATURE_DEPTH = 2
+
+# Layout-only tokens carry no meaning for similarity
+_SKIPPED_TOKENS = {
+    tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE, tokenize.INDENT,
+    tokenize.DEDENT, tokenize.ENCODING, tokenize.ENDMARKER
+}
+_FALLBACK_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def code_tokens(code):
+    """
+    Tokenize code with Python's tokenizer, keeping names, literals and operators.
+    Text that is not valid Python falls back to a word/punctuation split.
+    """
+    try:
+        return [
+            token.string
+            for token in tokenize.generate_tokens(io.StringIO(code).readline)
+            if token.type not in _SKIPPED_TOKENS
+        ]
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return _FALLBACK_TOKEN.findall(code)
+
+
+def _ngrams(tokens, n):
+    return Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+
+
+def bleu_score(reference_tokens, candidate_tokens, max_n=BLEU_MAX_N):
+    """
+    Sentence BLEU: geometric mean of clipped 1..max_n-gram precisions times
+    the brevity penalty, with epsilon smoothing for orders without matches.
+    """
+    if not reference_tokens or not candidate_tokens:
+        return 0.0
+
+    # Short snippets cannot have n-grams longer than themselves
+    max_n = max(1, min(max_n, len(reference_tokens), len(candidate_tokens)))
+    log_precision = 0.0
+    for n in range(1, max_n + 1):
+        candidate_ngrams = _ngrams(candidate_tokens, n)
+        reference_ngrams = _ngrams(reference_tokens, n)
+        matches = sum(min(count, reference_ngrams[gram]) for gram, count in candidate_ngrams.items())
+        total = sum(candidate_ngrams.values())
+        log_precision += math.log((matches or BLEU_SMOOTHING_EPSILON) / total)
+
+    candidate_length = len(candidate_tokens)
+    reference_length = len(reference_tokens)
+    brevity_penalty = 1.0 if candidate_length > reference_length else \
+        math.exp(1 - reference_length / candidate_length)
+    return brevity_penalty * math.exp(log_precision / max_n)
+
+
+def _signature(node, depth):
+    name = type(node).__name__
+    if depth == 0:
+        return name
+    children = [_signature(child, depth - 1) for child in ast.iter_child_nodes(node)]
+    return f"{name}({','.join(children)})" if children else name
+
+
+def ast_signatures(code, depth=AST_SIGNATURE_DEPTH):
+    """
+    Structural signatures of every node in the code's AST, ignoring names and
+    literal values. Returns None if the code does not parse.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+    return Counter(_signature(node, depth) for node in ast.walk(tree)
+                   if not isinstance(node, (ast.Load, ast.Store, ast.Del)))
+
+
+def ast_similarity(reference_signatures, candidate_signatures):
+    """
+    Share of the reference's subtrees that also appear in the candidate, like
+    CodeBLEU's syntactic match. 0.0 if either side does not parse.
+    """
+    if not reference_signatures or not candidate_signatures:
+        return 0.0
+    matches = sum((reference_signatures & candidate_signatures).values())
+    return matches / sum(reference_signatures.values())
+
+
+def _pairwise_cosine(token_lists, pair_count):
+    """
+    Cosine similarity of (reference, candidate) rows laid out as
+    [ref_0, cand_0, ref_1, cand_1, ...], from a single TF-IDF fit.
+    """
+    if not any(token_lists):
+        return np.zeros(pair_count)
+    vectorizer = TfidfVectorizer(analyzer=lambda tokens: tokens, lowercase=False)
+    try:
+        # Rows are L2-normalised, so the row-wise dot product is the cosine
+        matrix = vectorizer.fit_transform(token_lists)
+    except ValueError:  # empty vocabulary
+        return np.zeros(pair_count)
+    references = matrix[0::2]
+    candidates = matrix[1::2]
+    return np.asarray(references.multiply(candidates).sum(axis=1)).ravel()
+
+
+def compute_suite_similarity(pairs):
+    """
+    Similarity metrics for a list of (expected_code, generated_code) pairs.
+
+    Each distinct snippet is tokenized and parsed once, and cosine similarity
+    for the whole suite comes from one TF-IDF fit over a shared vocabulary.
+    Returns one metrics dict per pair, in order.
+    """
+    if not pairs:
+        return []
+
+    tokens = {}
+    signatures = {}
+    for pair in pairs:
+        for code in pair:
+            if code not in tokens:
+                tokens[code] = code_tokens(code)
+                signatures[code] = ast_signatures(code)
+
+    token_lists = [tokens[code] for pair in pairs for code in pair]
+    cosines = _pairwise_cosine(token_lists, len(pairs))
+
+    metrics = []
+    for (expected_code, generated_code), cosine in zip(pairs, cosines):
+        metrics.append({
+            "Levenshtein Distance": Levenshtein.distance(expected_code, generated_code),
+            "BLEU Score": bleu_score(tokens[expected_code], tokens[generated_code]),
+            "AST Similarity": ast_similarity(signatures[expected_code], signatures[generated_code]),
+            "Cosine Similarity": float(min(1.0, cosine))
+        })
+    return metrics
@@ -0,0 +1,252 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from utils.code_generator import generate_pandas_code
+from utils.execution_pool import execute_code
+from LLMAnalyser.config import MAX_CONCURRENT_TEST_CASES
+from LLMAnalyser.syntax_analyser import is_valid_compile
+from LLMAnalyser.logical_analyser import is_valid_logic
+from LLMAnalyser.similarity import compute_suite_similarity
+from LLMAnalyser.efficiency_analyser import is_efficient
+from LLMAnalyser.antipattern_analyser import analyze_antipatterns
+
+
+def _build_result(test_case, generated_code, actual_output, status, analysis_results):
+    return {
+        "query": test_case["query"],
+        "expected_code": test_case["expected_code"],
+        "generated_code": generated_code,
+        "expected_output": test_case["expected_output"],
+        "actual_output": actual_output,
+        "status": status,
+        "analysis_results": analysis_results
+    }
+
+
+def _generate_and_execute(test_case, df):
+    """
+    Stage one: generate code for the case and run it.
+    Returns (generated_code, actual_output, error_record); error_record is
+    the finished result if the case cannot go on to analysis.
+    """
+    try:
+        generated_code = generate_pandas_code(
+            test_case['query'],
+            df,
+            context={"df": df}
+        )
+    except Exception as e:
+        return None, None, _build_result(test_case, "Failed to generate code", f"Error: {str(e)}", "error", {})
+
+    if not generated_code:
+        return None, None, _build_result(test_case, "", "Error: No code generated", "error", {})
+
+    try:
+        # Runs in an isolated worker on its own shallow copy of df, so
+        # concurrent snippets cannot see each other's column changes
+        actual_output = execute_code(generated_code, df)
+    except Exception as e:
+        return generated_code, None, _build_result(test_case, generated_code, f"Error: {str(e)}", "error", {})
+
+    return generated_code, actual_output, None
+
+
+def _analyse_test_case(test_case, df, active_modules, generated_code, actual_output, similarity=None):
+    """
+    Stage two: run each active analysis module on generated code that has already run.
+
+    similarity, if given, is a Future for this case's similarity metrics from
+    the suite-wide batch; the logical module then runs last so the other
+    modules never wait for it.
+    """
+    analysis_results = {}
+
+    try:
+        expected_code = test_case["expected_code"] if test_case["expected_code"].strip() else None
+        selected = [module['id'] for module in active_modules]
+        if similarity is not None:
+            active_modules = ([module for module in active_modules if module['id'] != 'logical'] +
+                              [module for module in active_modules if module['id'] == 'logical'])
+
+        # Run each active module's analysis
+        for module in active_modules:
+            try:
+                if module['id'] == 'syntax':
+                    analysis_result = is_valid_compile(generated_code, test_case["expected_code"])
+                    analysis_results[module['id']] = {
+                        'name': module['name'],
+                        'result': analysis_result,
+                        'timestamp': time.time()
+                    }
+
+                    # If syntax check fails, stop further analysis
+                    if analysis_result['status'] == 'Invalid ❌':
+                        return _build_result(
+                            test_case, generated_code, "Syntax validation failed", "error",
+                            {'syntax': analysis_results['syntax']}
+                        )
+
+                elif module['id'] == 'logical':
+                    # Only proceed if syntax check passed
+                    if 'syntax' in analysis_results and \
+                    analysis_results['syntax']['result']['status'] == 'Valid ✅':
+                        analysis_result = is_valid_logic(
+                            generated_code,
+                            expected_code,
+                            test_case["expected_output"],
+                            actual_output,
+                            df,
+                            similarity_metrics=similarity.result() if similarity is not None else None
+                        )
+                        analysis_results[module['id']] = {
+                            'name': module['name'],
+                            'result': analysis_result,
+                            'timestamp': time.time()
+                        }
+
+                elif module['id'] == 'efficiency':
+                    # Only proceed if syntax check passed
+                    if 'syntax' in analysis_results and \
+                    analysis_results['syntax']['result']['status'] == 'Valid ✅':
+                        analysis_result = is_efficient(
+                            generated_code,
+                            expected_code,
+                            df
+                        )
+                        analysis_results[module['id']] = {
+                            'name': module['name'],
+                            'result': analysis_result,
+                            'timestamp': time.time()
+                        }
+
+                elif module['id'] == 'antipattern':
+                    # Static check, cheap enough to run without a syntax gate
+                    analysis_results[module['id']] = {
+                        'name': module['name'],
+                        'result': analyze_antipatterns(generated_code),
+                        'timestamp': time.time()
+                    }
+
+            except Exception as e:
+                analysis_results[module['id']] = {
+                    'name': module['name'],
+                    'error': str(e),
+                    'timestamp': time.time()
+                }
+
+        # Back in the order the modules were selected, which is the order they are shown in
+        analysis_results = {module_id: analysis_results[module_id] for module_id in selected
+                            if module_id in analysis_results}
+        return _build_result(test_case, generated_code, actual_output, "success", analysis_results)
+
+    except Exception as e:
+        return _build_result(test_case, generated_code, f"Error: {str(e)}", "error", analysis_results)
+
+
+def run_test_case(test_case, df, active_modules):
+    """
+    Generate, execute and analyse a single test case.
+
+    This does not touch Streamlit session state, so it is safe to call from
+    worker threads. Returns the result record for the case.
+    """
+    generated_code, actual_output, error = _generate_and_execute(test_case, df)
+    if error is not None:
+        return error
+    return _analyse_test_case(test_case, df, active_modules, generated_code, actual_output)
+
+
+def _resolve_similarity(similarity, test_cases, generated_codes):
+    """Score every pending pair with one compute_suite_similarity call."""
+    indices = sorted(similarity)
+    try:
+        metrics = compute_suite_similarity(
+            [(test_cases[idx]["expected_code"], generated_codes[idx]) for idx in indices]
+        )
+    except Exception as e:
+        for idx in indices:
+            similarity[idx].set_exception(e)
+        return
+    for idx, case_metrics in zip(indices, metrics):
+        similarity[idx].set_result(case_metrics)
+
+
+def run_test_cases_concurrently(test_cases, df, active_modules, max_workers=None, on_progress=None):
+    """
+    Run test cases on a thread pool with a bounded number of cases in flight.
+
+    Each case goes through two stages: code generation and execution, then
+    the analysis modules. A case's analysis is submitted as soon as its own
+    generation finishes, without waiting for the rest of the suite. Once
+    every case has been generated, similarity metrics for all (expected,
+    generated) pairs are computed in one batch on the calling thread and
+    handed to the logical module, which each case runs last. Results
+    are returned in the same order as test_cases. on_progress, if given, is
+    called from the calling thread as on_progress(index, result, completed,
+    total) each time a case finishes a stage; result is None after
+    generation. total counts both stages, so completed / total is the
+    overall fraction done.
+    """
+    total = len(test_cases)
+    results = [None] * total
+    if total == 0:
+        return results
+
+    max_workers = max(1, min(max_workers or MAX_CONCURRENT_TEST_CASES, total))
+    completed = 0
+    batch_similarity = any(module['id'] == 'logical' for module in active_modules)
+
+    def report(idx, result):
+        nonlocal completed
+        completed += 1
+        if on_progress is not None:
+            on_progress(idx, result, completed, 2 * total)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="test-case") as executor:
+        # future -> (stage, index)
+        pending = {
+            executor.submit(_generate_and_execute, test_case, df): ("generate", idx)
+            for idx, test_case in enumerate(test_cases)
+        }
+        generating = total
+        generated_codes = {}
+        # index -> Future for the case's metrics, resolved by the suite-wide batch
+        similarity = {}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, idx = pending.pop(future)
+                if stage == "generate":
+                    generating -= 1
+                    try:
+                        generated_code, actual_output, error = future.result()
+                    except Exception as e:
+                        generated_code, actual_output = None, None
+                        error = _build_result(
+                            test_cases[idx], "Failed to generate code", f"Error: {str(e)}", "error", {}
+                        )
+                    report(idx, None)
+                    if error is not None:
+                        results[idx] = error
+                        report(idx, error)
+                    else:
+                        generated_codes[idx] = generated_code
+                        if batch_similarity and test_cases[idx]["expected_code"].strip():
+                            similarity[idx] = Future()
+                        pending[executor.submit(
+                            _analyse_test_case, test_cases[idx], df, active_modules, generated_code,
+                            actual_output, similarity.get(idx)
+                        )] = ("analyse", idx)
+                    if generating == 0 and similarity:
+                        _resolve_similarity(similarity, test_cases, generated_codes)
+                else:
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = _build_result(
+                            test_cases[idx], generated_codes.get(idx), f"Error: {str(e)}", "error", {}
+                        )
+                    results[idx] = result
+                    report(idx, result)
+
+    return results
@@ -1,11 +1,22 @@
+import base64
+import os
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 
 from styles.main import get_css
-from utils.code_generator import generate_pandas_code
+from utils.code_generator import generate_pandas_code_stream
 from utils.preprocessing import fill_null_values, remove_null_rows, normalize_columns, detect_patterns
-from utils.visualization import create_plot
+from utils.figure_cache import cached_plot
+from utils.prerender import start_prerender
+from utils.execution_pool import execute_code, get_execution_pool
+from utils.ingestion import describe_load
+from utils.dataframe_cache import load_cached_csv, content_hash, remember_hash, source_identity
+from utils.streaming import profile_csv_stream
+from utils.pipeline import STEP_FUNCTIONS, run_pipeline
+from utils.dataset_store import derive_key, export_csv
+from LLMAnalyser.antipattern_analyser import detect_antipatterns
 from utils.chat_handler import (
     init_chat_history, 
     add_message, 
@@ -18,9 +29,36 @@ from src.components import (
     render_dataset_info,
     render_dataset_preview,
     render_plot_suggestions,
+    render_streaming_profile,
     display_result
 )
 
+def render_streaming_mode(source, stream_key):
+    """Show statistics computed chunk by chunk; load the full frame only for a query."""
+    cached = st.session_state.get('stream_profile')
+    if cached is None or cached[0] != stream_key:
+        progress = st.empty()
+        profile = profile_csv_stream(
+            source,
+            on_chunk=lambda partial: progress.caption(f"Profiled {partial.rows:,} rows...")
+        )
+        progress.empty()
+        # The content was hashed while profiling; loading the full frame reuses it
+        remember_hash(stream_key, profile.content_hash)
+        st.session_state.stream_profile = (stream_key, profile)
+    else:
+        profile = cached[1]
+
+    render_streaming_profile(profile)
+
+    load_full = st.button("Load full dataset")
+    question = st.chat_input("What would you like to know about your data?", key="stream_chat_input")
+    if load_full or question:
+        # The next run takes the normal path and answers the pending question
+        st.session_state.materialized_key = stream_key
+        st.session_state.pending_question = question
+        st.rerun()
+
 def main():
     # Set page config for full width
     st.set_page_config(
@@ -45,6 +83,7 @@ def main():
         - 📁 Upload any CSV file
         - 📋 View column list and dataset information
         - 🔍 Preview your data instantly
+        - 🌊 Streaming mode profiles very large files chunk by chunk
         
         #### 2. Data Preprocessing
         - 🧹 **Fill Missing Values**
@@ -88,11 +127,48 @@ def main():
 
     # File upload section
     uploaded_file = st.file_uploader("Choose a CSV file", type="csv")
+    streaming_mode = st.toggle(
+        "Streaming mode",
+        help="Profile large files chunk by chunk; the full dataset is only loaded when you ask a question"
+    )
     
-    if uploaded_file is not None:
+    source = uploaded_file
+    if streaming_mode:
+        server_path = st.text_input(
+            "Or a CSV path on the server",
+            help="Streamed from disk without being held in memory"
+        )
+        st.caption("Uploads are held in server memory in full, so they are limited by the server's "
+                   "memory and upload size limit. Give a path on the server for larger files.")
+        if server_path:
+            if not os.path.isfile(server_path):
+                st.error(f"No such file on the server: {server_path}")
+                return
+            source = server_path
+
+    if source is not None and streaming_mode:
+        # Identifies the source without reading it; hashing happens during profiling
+        stream_key = source_identity(source) or content_hash(source)
+        if st.session_state.get('materialized_key') != stream_key:
+            render_streaming_mode(source, stream_key)
+            return
+    
+    if source is not None:
         try:
-            # Read the CSV file
-            df = pd.read_csv(uploaded_file)
+            # Parse once per file; reruns reuse the cached frame
+            original_df, load_stats, dataset_key = load_cached_csv(source)
+
+            # Preprocessing replaces the session's working copy, so it
+            # survives reruns until a different file is uploaded
+            if st.session_state.get('dataset_key') != dataset_key:
+                st.session_state.dataset_key = dataset_key
+                st.session_state.df = original_df
+                st.session_state.df_key = dataset_key
+            df = st.session_state.df
+
+            # Start the execution workers and suggestion renders while the user looks at the data
+            get_execution_pool()
+            start_prerender(df, st.session_state.df_key)
             
             # Create main layout with columns
             col1, col2 = st.columns([2, 5])
@@ -101,6 +177,11 @@ def main():
                 # Render column list and dataset info
                 render_column_list(df)
                 render_dataset_info(df)
+                st.caption(describe_load(load_stats))
+                if df is not original_df and st.button("↺ Reset to uploaded data"):
+                    st.session_state.df = original_df
+                    st.session_state.df_key = dataset_key
+                    st.rerun()
                 
                 # Add preprocessing section
                 st.markdown("### Data Preprocessing")
@@ -108,7 +189,7 @@ def main():
                 with preprocess_expander:
                     preprocessing_type = st.selectbox(
                         "Select Preprocessing Type",
-                        ["Fill Null Values", "Remove Null Rows", "Normalize Data", "Detect Patterns"]
+                        ["Fill Null Values", "Remove Null Rows", "Normalize Data", "Detect Patterns", "Pipeline"]
                     )
                     
                     if preprocessing_type == "Fill Null Values":
@@ -116,6 +197,8 @@ def main():
                         if st.button("Apply Fill"):
                             original_nulls = df.isnull().sum().sum()
                             df = fill_null_values(df, method=fill_method)
+                            st.session_state.df = df
+                            st.session_state.df_key = derive_key(st.session_state.df_key, 'fill_null_values', {"method": fill_method})
                             remaining_nulls = df.isnull().sum().sum()
                             
                             st.markdown("### Results of Filling Null Values")
@@ -132,6 +215,8 @@ def main():
                         if st.button("Remove Nulls"):
                             original_rows = len(df)
                             df = remove_null_rows(df, threshold=threshold)
+                            st.session_state.df = df
+                            st.session_state.df_key = derive_key(st.session_state.df_key, 'remove_null_rows', {"threshold": threshold})
                             remaining_rows = len(df)
                             
                             st.markdown("### Results of Removing Null Rows")
@@ -154,6 +239,8 @@ def main():
                             st.dataframe(df[selected_cols].describe())
                             
                             df = normalize_columns(df, method=norm_method, columns=selected_cols)
+                            st.session_state.df = df
+                            st.session_state.df_key = derive_key(st.session_state.df_key, 'normalize_columns', {"method": norm_method, "columns": list(selected_cols)})
                             
                             st.markdown("### Results of Normalization")
                             st.write(f"✨ Successfully normalized data using **{norm_method}** method!")
@@ -165,14 +252,64 @@ def main():
                                 st.markdown("### Distribution Visualization")
                                 st.write("Here's a visualization of the normalized distributions:")
                                 for col in selected_cols[:3]:  # Limit to first 3 columns to avoid cluttering
-                                    fig = create_plot('histogram', df, x=col, title=f'Distribution of {col} after {norm_method} normalization')
-                                    st.plotly_chart(fig)
+                                    plot = cached_plot('histogram', df, x=col, title=f'Distribution of {col} after {norm_method} normalization',
+                                                       dataset_key=st.session_state.df_key)
+                                    st.image(base64.b64decode(plot['figure']))
+                            
+                    elif preprocessing_type == "Pipeline":
+                        # Steps run from the uploaded data; cached steps are reused
+                        steps = st.session_state.setdefault('pipeline_steps', [])
+                        step_type = st.selectbox("Step", list(STEP_FUNCTIONS))
+                        if step_type == "fill_null_values":
+                            params = {"method": st.selectbox("Fill Method", ["mean", "median", "zero"], key="pipeline_fill")}
+                        elif step_type == "remove_null_rows":
+                            params = {"threshold": st.slider("Null Threshold", 0.0, 1.0, 0.5, key="pipeline_threshold")}
+                        else:
+                            numeric_cols = list(original_df.select_dtypes(include=[np.number]).columns)
+                            params = {
+                                "method": st.selectbox("Normalization Method", ["minmax", "standard", "log"],
+                                                       key="pipeline_norm"),
+                                "columns": st.multiselect("Select Columns", numeric_cols, default=numeric_cols,
+                                                          key="pipeline_columns")
+                            }
+                        if st.button("Add Step"):
+                            steps.append({"step": step_type, "params": params})
+                        
+                        for position, step in enumerate(steps):
+                            step_col, remove_col = st.columns([5, 1])
+                            step_col.write(f"{position + 1}. `{step['step']}` {step['params']}")
+                            if remove_col.button("✕", key=f"pipeline_remove_{position}"):
+                                steps.pop(position)
+                                st.rerun()
+                        
+                        if steps and st.button("Run Pipeline"):
+                            df, report = run_pipeline(original_df, dataset_key, steps)
+                            st.session_state.df = df
+                            st.session_state.df_key = report[-1]["key"]
+                            
+                            st.markdown("### Pipeline Results")
+                            st.dataframe(pd.DataFrame([
+                                {"Step": entry["step"], "Cached": entry["cached"],
+                                 "Seconds": round(entry["seconds"], 3), "Rows": entry["rows"]}
+                                for entry in report
+                            ]))
+                            st.markdown("### Preview of Processed Data")
+                            st.dataframe(df.head())
                             
                     elif preprocessing_type == "Detect Patterns":
+                        exact_patterns = st.checkbox(
+                            "Exact statistics",
+                            help="Scan every row; large datasets otherwise use sampled estimates"
+                        )
                         if st.button("Analyze Patterns"):
-                            patterns = detect_patterns(df)
+                            patterns = detect_patterns(df, mode='exact' if exact_patterns else 'auto')
                             
                             st.markdown("### 📊 Data Pattern Analysis")
+                            if patterns['mode'] == 'approximate':
+                                st.caption(
+                                    f"Approximate statistics from a sample of {patterns['sample_rows']:,} rows; "
+                                    "unique counts are estimates"
+                                )
                             
                             st.markdown("#### Missing Values Analysis")
                             st.write("Here's the percentage of missing values in each column:")
@@ -200,29 +337,43 @@ def main():
                             
                             st.markdown("#### Correlation Analysis")
                             st.write("Here's the correlation matrix for numeric columns:")
-                            fig = create_plot('heatmap', df, data=patterns['numeric_correlations'], 
-                                           title='Correlation Matrix')
-                            st.plotly_chart(fig)
+                            if patterns['correlation_columns_omitted']:
+                                st.caption(
+                                    f"{patterns['correlation_columns_omitted']} weakly correlated numeric "
+                                    "columns were left out of the matrix"
+                                )
+                            plot = cached_plot('heatmap', patterns['numeric_correlations'], title='Correlation Matrix')
+                            st.image(base64.b64decode(plot['figure']))
+                            
+                            if patterns['top_correlations']:
+                                st.markdown("#### Strongest Correlations")
+                                st.dataframe(pd.DataFrame([
+                                    {"Column A": pair["x"], "Column B": pair["y"], "r": round(pair["r"], 3),
+                                     "95% CI": f"[{pair['ci_low']:.3f}, {pair['ci_high']:.3f}]", "Rows": pair["n"]}
+                                    for pair in patterns['top_correlations']
+                                ]))
                     
                     # Download preprocessed data
                     if len(df) > 0:  # Only show download button if we have data
                         st.markdown("### 💾 Download Processed Data")
                         st.write("You can download your processed data as a CSV file:")
-                        csv = df.to_csv(index=False)
-                        st.download_button(
-                            label="📥 Download Preprocessed CSV",
-                            data=csv,
-                            file_name="preprocessed_data.csv",
-                            mime="text/csv",
-                            help="Click to download the preprocessed dataset"
-                        )
+                        # Written once per processed version and streamed from disk
+                        csv_path = export_csv(st.session_state.df_key, df)
+                        with open(csv_path, 'rb') as csv:
+                            st.download_button(
+                                label="📥 Download Preprocessed CSV",
+                                data=csv,
+                                file_name="preprocessed_data.csv",
+                                mime="text/csv",
+                                help="Click to download the preprocessed dataset"
+                            )
             
             with col2:
                 # Render dataset preview
                 render_dataset_preview(df)
                 
                 # Render plot suggestions
-                render_plot_suggestions(df)
+                render_plot_suggestions(st.session_state.df, st.session_state.df_key)
                 
                 # Initialize chat
                 init_chat_history()
@@ -241,7 +392,9 @@ def main():
                         render_chat_interface()
                         
                         # Chat input
-                    if question := st.chat_input("What would you like to know about your data?", key="chat_input"):
+                    question = st.chat_input("What would you like to know about your data?", key="chat_input") or \
+                        st.session_state.pop('pending_question', None)
+                    if question:
                         # Add user message to chat and show immediately
                         add_message("user", question)
                         # st.rerun()  # Force refresh to show user message
@@ -250,32 +403,26 @@ def main():
                         # Process the query in the next run
                         if st.session_state.messages[-1]["role"] == "user":
                             # Get context and generate code
-                            context = get_chat_context()
+                            context, prompt_columns, context_report = get_chat_context(question, df.columns)
                             with st.spinner("Thinking..."):
-                                generated_code = generate_pandas_code(question, df, context=context)
+                                # Show the code as it is generated; execution starts once it is complete
+                                code_preview = st.empty()
+                                generated_code, prompt_stats = None, None
+                                for event in generate_pandas_code_stream(
+                                    question, df, context=context, columns=prompt_columns
+                                ):
+                                    if event["type"] == "partial":
+                                        code_preview.code(event["code"], language="python")
+                                    else:
+                                        generated_code, prompt_stats = event["code"], event["stats"]
+                                        code_preview.code(generated_code, language="python")
                                 
                                 
                                 if generated_code:
                                     try:
-                                        # Create namespace with imports
-                                        namespace = {
-                                            'df': df,
-                                            'pd': pd,
-                                            'np': np,
-                                            'create_plot': create_plot,
-                                            'result': None
-                                        }
-                                        
                                         try:
-                                            # Clean and execute code
-                                            clean_code = '\n'.join(
-                                                line for line in generated_code.split('\n')
-                                                if line.strip() and not line.strip().startswith('#')
-                                            )
-                                            exec(clean_code, namespace)
-                                            
-                                            # Get the result
-                                            result = namespace.get('result')
+                                            # Execute in an isolated worker with time and memory limits
+                                            result = execute_code(generated_code, df)
                                             
                                             # Add assistant message with code and result
                                             if isinstance(result, str):
@@ -283,11 +430,19 @@ def main():
                                             else:
                                                 message = "Here's what I found based on your question."
                                             
+                                            # Static anti-pattern check, no execution needed
+                                            try:
+                                                hints = detect_antipatterns(generated_code)
+                                            except SyntaxError:
+                                                hints = []
+                                            
                                             add_message(
                                                 "assistant",
                                                 message,
                                                 code=generated_code,
-                                                result=result
+                                                result=result,
+                                                hints=hints,
+                                                prompt_stats=dict(prompt_stats, **context_report)
                                             )
                                             
                                             # Update context
@@ -1,6 +1,10 @@
+import base64
 import streamlit as st
 import pandas as pd
-from utils.visualization import suggest_plots, create_plot
+import plotly.graph_objects as go
+from utils.prerender import start_prerender, plot_suggestion
+
+THUMBNAIL_HEIGHT = 240
 
 def render_column_list(df):
     """Render the available columns list."""
@@ -23,7 +27,7 @@ def render_dataset_info(df):
             <h4>Dataset Info</h4>
             <p>Total rows: {len(df):,}</p>
             <p>Total columns: {len(df.columns)}</p>
-            <p>Memory usage: {df.memory_usage().sum() / 1024 / 1024:.2f} MB</p>
+            <p>Memory usage: {df.memory_usage(deep=True).sum() / 1024 / 1024:.2f} MB</p>
         </div>
     """, unsafe_allow_html=True)
 
@@ -32,38 +36,104 @@ def render_dataset_preview(df):
     st.markdown("### Dataset Preview (Top 5 Rows)")
     st.dataframe(df.head(5))
 
-def render_plot_suggestions(df):
-    """Render plot suggestions based on data types."""
-    suggestions = suggest_plots(df)
-    suggestions = False
-    if suggestions:
-        st.markdown("### Suggested Visualizations")
-        cols = st.columns(2)
-        for i, suggestion in enumerate(suggestions):
-            with cols[i % 2]:
-                if st.button(suggestion['description'], key=f"viz_{i}"):
-                    with st.spinner("Creating visualization..."):
-                        try:
-                            x = suggestion.get('x')
-                            y = suggestion.get('y')
-                            plot_type = suggestion['type']
-                            
-                            image = create_plot(
-                                plot_type=plot_type,
-                                data=df,
-                                x=x,
-                                y=y,
-                                title=suggestion['description']
-                            )
-                            
-                            st.markdown(f"""
-                                <img src="data:image/png;base64,{image}" 
-                                style="width: 100%; border-radius: 5px; margin: 10px 0;">
-                                """, 
-                                unsafe_allow_html=True
-                            )
-                        except Exception as e:
-                            st.error(f"Error creating visualization: {str(e)}")
+def render_streaming_profile(profile):
+    """Render dataset info, preview and patterns computed by a streaming profile."""
+    info = profile.dataset_info()
+    st.markdown(f"""
+        <div class="info-box">
+            <h4>Dataset Info (streamed)</h4>
+            <p>Total rows: {info['rows']:,}</p>
+            <p>Total columns: {info['columns']}</p>
+            <p>Read in {info['chunks']} chunks without loading the full file</p>
+        </div>
+    """, unsafe_allow_html=True)
+
+    st.markdown("### Dataset Preview (Top 5 Rows)")
+    st.dataframe(profile.preview)
+
+    patterns = profile.patterns()
+    st.markdown("#### Missing Values Analysis")
+    st.dataframe(pd.DataFrame({
+        'Column': patterns['missing_percentages'].index,
+        'Missing %': patterns['missing_percentages'].values
+    }).sort_values('Missing %', ascending=False))
+
+    st.markdown("#### Unique Values Count (approximate)")
+    st.dataframe(pd.DataFrame({
+        'Column': patterns['unique_counts'].index,
+        'Unique Values': patterns['unique_counts'].values
+    }))
+
+    st.markdown("#### Data Types")
+    st.dataframe(pd.DataFrame({
+        'Column': patterns['data_types'].index,
+        'Data Type': patterns['data_types'].values.astype(str)
+    }))
+
+    if not patterns['numeric_correlations'].empty:
+        st.markdown("#### Correlation Analysis")
+        st.dataframe(patterns['numeric_correlations'].round(3))
+
+def _render_figure(plot, height=None):
+    """Show a create_plot result; height shrinks it to a static thumbnail."""
+    figure = plot['figure']
+    if isinstance(figure, str):
+        st.image(base64.b64decode(figure), use_column_width=True)
+    elif height is None:
+        st.plotly_chart(figure, use_container_width=True)
+    else:
+        thumbnail = go.Figure(figure).update_layout(
+            height=height, margin=dict(l=10, r=10, t=30, b=10), showlegend=False, title_font_size=12
+        )
+        st.plotly_chart(thumbnail, use_container_width=True, config={'staticPlot': True})
+
+def render_plot_suggestions(df, dataset_key):
+    """Render plot suggestions as thumbnails pre-rendered in the background."""
+    job = start_prerender(df, dataset_key)
+    if job.suggestions is None:
+        st.caption("Preparing suggested visualizations…")
+        st.button("↻ Refresh", key="viz_refresh")
+        return
+    if not job.suggestions:
+        return
+
+    st.markdown("### Suggested Visualizations")
+    if not job.done:
+        st.caption("More suggestions are rendering in the background.")
+        st.button("↻ Refresh", key="viz_refresh")
+
+    cols = st.columns(2)
+    for i, suggestion in enumerate(job.suggestions):
+        with cols[i % 2]:
+            st.markdown(f"**{suggestion['description']}**")
+            if i in job.plots:
+                _render_figure(job.plots[i], height=THUMBNAIL_HEIGHT)
+                if st.button("Open", key=f"viz_open_{i}"):
+                    st.session_state.open_suggestion = (dataset_key, i)
+            elif i in job.errors:
+                st.caption(f"Could not render: {job.errors[i]}")
+            elif job.done and st.button("Render", key=f"viz_{i}"):
+                # Suggestions past the background time budget render on demand
+                with st.spinner("Creating visualization..."):
+                    try:
+                        job.plots[i] = plot_suggestion(df, suggestion, dataset_key, thumbnail=True)
+                        st.session_state.open_suggestion = (dataset_key, i)
+                    except Exception as e:
+                        st.error(f"Error creating visualization: {str(e)}")
+
+    opened = st.session_state.get('open_suggestion')
+    if opened and opened[0] == dataset_key and opened[1] in job.plots:
+        suggestion = job.suggestions[opened[1]]
+        st.markdown(f"#### {suggestion['description']}")
+        # Thumbnails use reduced budgets; the full figure is rendered (and cached) on open
+        try:
+            plot = plot_suggestion(df, suggestion, dataset_key)
+        except Exception as e:
+            st.error(f"Error creating visualization: {str(e)}")
+            return
+        _render_figure(plot)
+        if plot.get('data') is not None:
+            st.dataframe(plot['data'])
 
 def display_result(result):
     """Display the analysis result in appropriate format."""
@@ -0,0 +1,120 @@
+import gc
+import math
+import time
+
+import numpy as np
+
+DEFAULT_WARMUP = 2
+DEFAULT_MIN_REPEATS = 7
+DEFAULT_MAX_REPEATS = 200
+# Stop once the 95% confidence interval of the median is within +/- 5%
+DEFAULT_TARGET_REL_CI = 0.05
+DEFAULT_TIME_BUDGET = 5.0
+
+# Generated code only counts as slower when the difference is both
+# statistically significant and large enough to matter
+SIGNIFICANCE_LEVEL = 0.01
+MIN_SLOWDOWN_RATIO = 1.25
+
+
+def median_confidence_interval(sorted_times, z=1.96):
+    """Distribution-free confidence interval for the median from order statistics."""
+    n = len(sorted_times)
+    if n < 3:
+        return sorted_times[0], sorted_times[-1]
+    half_width = z * math.sqrt(n) / 2
+    lower = max(0, int(math.floor(n / 2 - half_width)))
+    upper = min(n - 1, int(math.ceil(n / 2 + half_width)))
+    return sorted_times[lower], sorted_times[upper]
+
+
+def summarize_timings(times):
+    """Median, p95, min and a confidence interval for a list of run times in seconds."""
+    ordered = sorted(times)
+    median = float(np.median(ordered))
+    ci_low, ci_high = median_confidence_interval(ordered)
+    return {
+        "runs": len(ordered),
+        "median": median,
+        "p95": float(np.percentile(ordered, 95)),
+        "min": float(ordered[0]),
+        "mean": float(np.mean(ordered)),
+        "stdev": float(np.std(ordered, ddof=1)) if len(ordered) > 1 else 0.0,
+        "ci_low": float(ci_low),
+        "ci_high": float(ci_high),
+        "rel_ci": float((ci_high - ci_low) / (2 * median)) if median > 0 else 0.0
+    }
+
+
+def benchmark(code_obj, make_namespace, warmup=DEFAULT_WARMUP, min_repeats=DEFAULT_MIN_REPEATS,
+              max_repeats=DEFAULT_MAX_REPEATS, target_rel_ci=DEFAULT_TARGET_REL_CI,
+              time_budget=DEFAULT_TIME_BUDGET, disable_gc=True):
+    """
+    Time a pre-compiled code object.
+
+    Runs `warmup` untimed iterations, then timed iterations until the median's
+    confidence interval is tight enough, max_repeats is reached or the time
+    budget is spent. Each run gets a fresh namespace from make_namespace(),
+    built outside the timed region. The garbage collector is run between
+    iterations and disabled during them.
+    """
+    started = time.perf_counter()
+
+    for _ in range(warmup):
+        exec(code_obj, make_namespace())
+        if time.perf_counter() - started > time_budget:
+            break
+
+    times = []
+    gc_was_enabled = gc.isenabled()
+    try:
+        while len(times) < max_repeats:
+            namespace = make_namespace()
+            if disable_gc:
+                gc.collect()
+                gc.disable()
+            try:
+                run_start = time.perf_counter()
+                exec(code_obj, namespace)
+                times.append(time.perf_counter() - run_start)
+            finally:
+                if disable_gc and gc_was_enabled:
+                    gc.enable()
+
+            if time.perf_counter() - started > time_budget and times:
+                break
+            if len(times) >= min_repeats and summarize_timings(times)["rel_ci"] <= target_rel_ci:
+                break
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    return times
+
+
+def compare_timings(candidate_times, baseline_times, alpha=SIGNIFICANCE_LEVEL,
+                    min_ratio=MIN_SLOWDOWN_RATIO):
+    """
+    Decide whether the candidate is slower than the baseline.
+
+    Uses a one-sided Mann-Whitney U test on the raw samples, so the decision
+    does not depend on a single noisy mean.
+    """
+    from scipy.stats import mannwhitneyu
+
+    candidate_median = float(np.median(candidate_times))
+    baseline_median = float(np.median(baseline_times))
+    ratio = candidate_median / baseline_median if baseline_median > 0 else float('inf')
+
+    if len(candidate_times) < 2 or len(baseline_times) < 2:
+        p_value = float('nan')
+        significant = False
+    else:
+        p_value = float(mannwhitneyu(candidate_times, baseline_times, alternative='greater').pvalue)
+        significant = p_value < alpha
+
+    return {
+        "slower": bool(significant and ratio >= min_ratio),
+        "ratio": ratio,
+        "p_value": p_value
+    }
@@ -1,11 +1,19 @@
+import os
 import streamlit as st
 from typing import List, Dict
 import time
 
+from utils.context_builder import build_context
+from utils.result_store import ResultStore, StoredResult
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '1200'))
+
 def init_chat_history():
     """Initialize chat history in session state if not present."""
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    if "result_store" not in st.session_state:
+        st.session_state.result_store = ResultStore()
     if "context" not in st.session_state:
         st.session_state.context = {
             "last_operation": None,
@@ -13,16 +21,21 @@ def init_chat_history():
             "data_insights": {}
         }
 
-def add_message(role: str, content: str, code: str = None, result: str = None):
-    """Add a message to the chat history."""
+def add_message(role: str, content: str, code: str = None, result: str = None, hints: List[Dict] = None,
+                prompt_stats: Dict = None):
+    """Add a message to the chat history; large results are spilled to the session's result store."""
+    store = st.session_state.result_store
     message = {
         "role": role,
         "content": content,
         "timestamp": time.time(),
         "code": code,
-        "result": result
+        "result": store.compact(result),
+        "hints": hints or [],
+        "prompt_stats": prompt_stats
     }
     st.session_state.messages.append(message)
+    store.enforce_memory_cap(st.session_state.messages)
 
 def update_context(operation: str = None, columns: List[str] = None, insight: Dict = None):
     """Update the conversation context."""
@@ -33,62 +46,76 @@ def update_context(operation: str = None, columns: List[str] = None, insight: Di
     if insight:
         st.session_state.context["data_insights"].update(insight)
 
-def get_chat_context():
-    """Get the current chat context as a string."""
-    context = st.session_state.context
-    last_messages = st.session_state.messages[-3:] if len(st.session_state.messages) > 0 else []
-    
-    context_str = "Previous context:\n"
+def get_chat_context(question: str = None, columns: List[str] = None, budget: int = None):
+    """
+    Get the conversation context for the next prompt within a token budget.
+
+    Returns (context_str, columns_to_show, report); see build_context.
+    """
+    return build_context(
+        question,
+        st.session_state.messages,
+        list(columns or []),
+        st.session_state.context,
+        budget=budget or CONTEXT_TOKEN_BUDGET
+    )
+
+def _render_result(result):
+    """Display a result held in memory."""
+    if isinstance(result, dict) and "figure" in result:
+        # Display the figure
+        fig = result["figure"]
+        if isinstance(fig, str):  # Base64 encoded image
+            st.markdown(f"<img src='data:image/png;base64,{fig}'/>", unsafe_allow_html=True)
+        else:  # Plotly figure
+            st.plotly_chart(fig, use_container_width=True)
+        
+        # Display the data if available
+        if result.get("data") is not None:
+            st.markdown("**Data Summary:**")
+            st.dataframe(result["data"])
     
-    if context["last_operation"]:
-        context_str += f"Last operation: {context['last_operation']}\n"
+    # Handle string results
+    elif isinstance(result, str):
+        st.markdown(result)
     
-    if context["last_columns_used"]:
-        context_str += f"Last used columns: {', '.join(context['last_columns_used'])}\n"
+    # Handle DataFrame results
+    elif str(type(result)).startswith("<class 'pandas"):
+        st.markdown("**Data Preview:**")
+        st.dataframe(result)
     
-    if last_messages:
-        context_str += "\nRecent conversation:\n"
-        for msg in last_messages:
-            if msg["role"] == "user":
-                context_str += f"User asked: {msg['content']}\n"
-            else:
-                if msg["code"]:
-                    context_str += f"Assistant generated code: {msg['code']}\n"
+    # Handle other types of results
+    else:
+        st.write(result)
+
+def _render_stored_result(stored: StoredResult, show_by_default: bool):
+    """Show a spilled result's preview; the full result is loaded only when asked for."""
+    if stored.preview is not None:
+        rows = stored.shape[0] if stored.shape else len(stored.preview)
+        st.markdown("**Data Preview:**")
+        st.dataframe(stored.preview)
+        st.caption(f"Showing {len(stored.preview)} of {rows:,} rows")
+        label = "Load full result"
+    else:
+        label = "Show result"
     
-    return context_str
+    if st.toggle(label, value=show_by_default and stored.preview is None, key=f"result_{stored.ref}"):
+        result = st.session_state.result_store.load(stored)
+        if result is None:
+            st.caption("This result has expired from the session store.")
+        else:
+            _render_result(result)
 
-def render_chat_message(message: Dict):
+def render_chat_message(message: Dict, is_latest: bool = False):
     """Render a single chat message."""
     with st.chat_message(message["role"]):
         if message["role"] == "user":
             st.markdown(f"You: {message['content']}")
         else:
-            if message.get("result") is not None :
-                if isinstance(message["result"], dict) and "figure" in message["result"]:
-                    # Display the figure
-                    fig = message["result"]["figure"]
-                    if isinstance(fig, str):  # Base64 encoded image
-                        st.markdown(f"<img src='data:image/png;base64,{fig}'/>", unsafe_allow_html=True)
-                    else:  # Plotly figure
-                        st.plotly_chart(fig, use_container_width=True)
-                    
-                    # Display the data if available
-                    if "data" in message["result"]:
-                        st.markdown("**Data Summary:**")
-                        st.dataframe(message["result"]["data"])
-                
-                # Handle string results
-                elif isinstance(message["result"], str):
-                    st.markdown(message["result"])
-                
-                # Handle DataFrame results
-                elif str(type(message["result"])).startswith("<class 'pandas"):
-                    st.markdown("**Data Preview:**")
-                    st.dataframe(message["result"])
-                
-                # Handle other types of results
-                else:
-                    st.write(message["result"])
+            if isinstance(message.get("result"), StoredResult):
+                _render_stored_result(message["result"], show_by_default=is_latest)
+            elif message.get("result") is not None :
+                _render_result(message["result"])
             else:
                 st.markdown(message["content"])
         
@@ -96,6 +123,24 @@ def render_chat_message(message: Dict):
             with st.expander("🔍 View Code"):
                 st.code(message["code"], language="python")
 
+        if message.get("prompt_stats"):
+            stats = message["prompt_stats"]
+            st.caption(
+                f"Prompt ~{stats['prompt_tokens']:,} tokens "
+                f"(context {stats['context_tokens']:,}, {stats['columns_shown']} columns, "
+                f"{stats['turns_shown']} recent turns{', cached' if stats.get('cached') else ''})"
+                + (f" · first code after {stats['first_token_seconds']:.1f}s"
+                   if stats.get('first_token_seconds') and not stats.get('cached') else "")
+            )
+
+        if message.get("hints"):
+            with st.expander(f"⚡ Performance hints ({len(message['hints'])})"):
+                for hint in message["hints"]:
+                    st.markdown(
+                        f"- Line {hint['line']}: **{hint['title']}** — {hint['estimated_cost']}. "
+                        f"{hint['suggestion']}."
+                    )
+
 def render_chat_interface():
     """Render the chat interface with message history."""
     # Create a container for chat messages
@@ -104,7 +149,10 @@ def render_chat_interface():
     # Display messages in the container
     with chat_container:
        
-        for message in st.session_state.messages:
-            render_chat_message(message)
+        messages = st.session_state.messages
+        for i, message in enumerate(messages):
+            render_chat_message(message, is_latest=i == len(messages) - 1)
+        # Results loaded for display count towards the session's memory cap
+        st.session_state.result_store.enforce_memory_cap(messages)
 
         
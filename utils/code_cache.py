@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+CACHE_DIR = os.getenv(
+    'CODE_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'generated_code')
+)
+MAX_ENTRIES = int(os.getenv('CODE_CACHE_MAX_ENTRIES', '2000'))
+MAX_BYTES = int(os.getenv('CODE_CACHE_MAX_BYTES', str(50 * 1024 * 1024)))
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+
+def make_cache_key(prompt, model_name, settings):
+    """Build a content hash from the full prompt and the model settings."""
+    payload = json.dumps(
+        {"prompt": prompt, "model": model_name, "settings": settings},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _entry_path(key):
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.json")
+
+
+def get_cached_code(key):
+    """Return cached code for the key, or None on a miss."""
+    path = _entry_path(key)
+    with _lock:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            _stats["misses"] += 1
+            return None
+
+        # Touch the entry so eviction sees it as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        _stats["hits"] += 1
+        return entry.get("code")
+
+
+def set_cached_code(key, code):
+    """Store generated code on disk and evict old entries if over budget."""
+    path = _entry_path(key)
+    entry = {"code": code, "created": time.time()}
+    with _lock:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+            _stats["writes"] += 1
+        except OSError:
+            return
+        _evict_if_needed()
+
+
+def _evict_if_needed():
+    """Drop least recently used entries until the cache fits its budget."""
+    entries = []
+    total_bytes = 0
+    for root, _, files in os.walk(CACHE_DIR):
+        for name in files:
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_bytes += stat.st_size
+
+    if len(entries) <= MAX_ENTRIES and total_bytes <= MAX_BYTES:
+        return
+
+    entries.sort()
+    while entries and (len(entries) > MAX_ENTRIES or total_bytes > MAX_BYTES):
+        _, size, path = entries.pop(0)
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total_bytes -= size
+        _stats["evictions"] += 1
+
+
+def get_cache_stats():
+    """Return hit/miss counters for the generated code cache."""
+    with _lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def clear_cache():
+    """Remove every cached entry and reset the counters."""
+    with _lock:
+        for root, _, files in os.walk(CACHE_DIR):
+            for name in files:
+                if name.endswith('.json'):
+                    try:
+                        os.remove(os.path.join(root, name))
+                    except OSError:
+                        pass
+        for counter in _stats:
+            _stats[counter] = 0
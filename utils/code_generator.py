@@ -1,8 +1,12 @@
 import os
+import re
+import time
 from dotenv import load_dotenv
 import google.generativeai as genai
 from google.generativeai.types import GenerationConfig
 import pandas as pd
+from utils.code_cache import make_cache_key, get_cached_code, set_cached_code
+from utils.context_builder import estimate_tokens
 
 load_dotenv()
 
@@ -50,10 +54,21 @@ def clean_code(code):
     
     return code
 
-def generate_pandas_code(question, df, include_viz=True, context=None):
-    """Generate pandas code using Google's Gemini API based on user question and available columns."""
-    
-    columns = list(df.columns)
+MODEL_NAME = 'gemini-2.0-flash'
+
+GENERATION_SETTINGS = {
+    "temperature": 0.2,  # Lower temperature for more consistent outputs
+    "top_p": 0.7,       # Nucleus sampling parameter
+    "max_output_tokens": 500,  # Maximum length of response
+    "candidate_count": 1  # Number of completion choices to generate
+}
+
+def build_prompt(question, df, include_viz=True, context=None, columns=None):
+    """Prompt for a question; columns limits the listed columns (e.g. to a context builder's ranked subset)."""
+    column_list = ', '.join(map(str, columns if columns is not None else df.columns))
+    omitted = len(df.columns) - len(columns) if columns is not None else 0
+    if omitted > 0:
+        column_list += f" (and {omitted} more columns not listed)"
 
 
     viz_hint = """
@@ -68,7 +83,7 @@ def generate_pandas_code(question, df, include_viz=True, context=None):
     
     context_info = f"\n{context}" if context else ""
     
-    prompt = f"""Your Are a Data Science Analysis and Python Expert. Generate ONLY Python code (no explanations) to analyze this dataset with columns: {', '.join(columns)}
+    prompt = f"""Your Are a Data Science Analysis and Python Expert. Generate ONLY Python code (no explanations) to analyze this dataset with columns: {column_list}
     Question: "{question}"{context_info}
     
     Example responses for visualization:
@@ -99,22 +114,116 @@ def generate_pandas_code(question, df, include_viz=True, context=None):
     
     {viz_hint if include_viz else ''}
     """
-    
+    return prompt
+
+
+def generate_pandas_code(question, df, include_viz=True, context=None, use_cache=True, columns=None,
+                         return_stats=False):
+    """Generate pandas code using Google's Gemini API based on user question and available columns.
+
+    Responses are cached on disk by a hash of the prompt and model settings, so an
+    identical question against the same columns and context skips the API call.
+    columns limits the listed columns (see build_prompt); with return_stats the
+    result is (code, stats) with the prompt size.
+    """
+    started = time.perf_counter()
+    prompt = build_prompt(question, df, include_viz, context, columns)
+
+    stats = {"prompt_chars": len(prompt), "prompt_tokens": estimate_tokens(prompt), "cached": False}
+    cache_key = make_cache_key(prompt, MODEL_NAME, GENERATION_SETTINGS)
+    if use_cache:
+        cached_code = get_cached_code(cache_key)
+        if cached_code is not None:
+            stats.update(cached=True, seconds=time.perf_counter() - started)
+            return (cached_code, stats) if return_stats else cached_code
+
     # Configure generation parameters
-    generation_config = GenerationConfig(
-        temperature=0.2,  # Lower temperature for more consistent outputs
-        top_p=0.7,       # Nucleus sampling parameter
-        max_output_tokens=500,  # Maximum length of response
-        candidate_count=1  # Number of completion choices to generate
-    )
+    generation_config = GenerationConfig(**GENERATION_SETTINGS)
     
     # Generate code using Gemini with configuration
-    model = genai.GenerativeModel('gemini-2.0-flash')
+    model = genai.GenerativeModel(MODEL_NAME)
     response = model.generate_content(
         prompt,
         generation_config=generation_config
     )
 
     cleaned_code = clean_code(response.text.strip())
+    if use_cache and cleaned_code:
+        set_cached_code(cache_key, cleaned_code)
+    stats["seconds"] = time.perf_counter() - started
     # Clean up the generated code
-    return cleaned_code
+    return (cleaned_code, stats) if return_stats else cleaned_code
+
+
+_OPEN_FENCE = re.compile(r'```(?:python|py)?[ \t]*\n')
+
+
+def split_fenced_code(text):
+    """Code in a (possibly still streaming) response, and whether its closing fence has arrived."""
+    opening = _OPEN_FENCE.search(text)
+    if opening is None:
+        return text.strip('`\n'), False
+    closing = text.find('```', opening.end())
+    if closing == -1:
+        # A closing fence may be arriving one backtick at a time
+        return text[opening.end():].rstrip('`'), False
+    return text[opening.end():closing], True
+
+
+def generate_pandas_code_stream(question, df, include_viz=True, context=None, use_cache=True, columns=None):
+    """Stream code generation, yielding events as tokens arrive.
+
+    Yields {"type": "partial", "code": ...} with the code formed so far, then a
+    single {"type": "complete", "code": ..., "stats": ...}. The snippet is
+    complete as soon as its closing fence arrives and it compiles; any trailing
+    tokens (usually an explanation) are not waited for. Cached responses yield
+    only the complete event.
+    """
+    started = time.perf_counter()
+    prompt = build_prompt(question, df, include_viz, context, columns)
+    stats = {"prompt_chars": len(prompt), "prompt_tokens": estimate_tokens(prompt), "cached": False}
+    cache_key = make_cache_key(prompt, MODEL_NAME, GENERATION_SETTINGS)
+    if use_cache:
+        cached_code = get_cached_code(cache_key)
+        if cached_code is not None:
+            stats.update(cached=True, seconds=time.perf_counter() - started, first_token_seconds=0.0)
+            yield {"type": "complete", "code": cached_code, "stats": stats}
+            return
+
+    model = genai.GenerativeModel(MODEL_NAME)
+    response = model.generate_content(
+        prompt,
+        generation_config=GenerationConfig(**GENERATION_SETTINGS),
+        stream=True
+    )
+
+    text = ""
+    code = ""
+    for chunk in response:
+        try:
+            piece = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. only a finish reason)
+            continue
+        if not text:
+            stats["first_token_seconds"] = time.perf_counter() - started
+        text += piece
+        code, closed = split_fenced_code(text)
+        yield {"type": "partial", "code": code}
+        if closed:
+            try:
+                compile(code, '<generated>', 'exec')
+            except SyntaxError:
+                continue
+            stats["stopped_early"] = True
+            break
+
+    if not text:
+        # Blocked or empty responses: raise the same error as the non-streaming path
+        response.text
+
+    cleaned_code = clean_code(code.strip())
+    if use_cache and cleaned_code:
+        set_cached_code(cache_key, cleaned_code)
+    stats["seconds"] = time.perf_counter() - started
+    yield {"type": "complete", "code": cleaned_code, "stats": stats}
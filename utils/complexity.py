@@ -0,0 +1,181 @@
+import os
+import time
+
+import numpy as np
+
+from utils.benchmark import benchmark
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_TIME_BUDGET = 15.0
+# Largest resampled frame, well inside the worker's memory limit so that
+# the snippet's own intermediates still fit
+MAX_SCALED_BYTES = int(os.getenv('COMPLEXITY_MAX_FRAME_MB', '256')) * 1024 * 1024
+# Row count used to project run time from the fitted curve
+PROJECTION_ROWS = 10_000_000
+# Classes at or beyond this one are reported as scaling risks
+RISKY_CLASSES = ("O(n²)", "O(n³)")
+RESIDUAL_TOLERANCE = 2.0
+
+# Ordered from simplest to most expensive; ties go to the simpler class
+COMPLEXITY_CLASSES = [
+    ("O(1)", lambda n: np.zeros_like(n)),
+    ("O(log n)", np.log),
+    ("O(n)", lambda n: n),
+    ("O(n log n)", lambda n: n * np.log(n)),
+    ("O(n²)", lambda n: n ** 2),
+    ("O(n³)", lambda n: n ** 3),
+]
+# Approximate log-log growth exponent of each class at large n
+CLASS_EXPONENTS = {"O(1)": 0.0, "O(log n)": 0.0, "O(n)": 1.0, "O(n log n)": 1.1, "O(n²)": 2.0, "O(n³)": 3.0}
+# A class is only eligible if its exponent is at most the measured tail slope plus this
+EXPONENT_SLACK = 0.5
+
+
+def scaled_frame(df, rows, seed=0):
+    """Row-sample df to the requested size, resampling with replacement if it is smaller."""
+    if rows == len(df):
+        return df
+    return df.sample(n=rows, replace=rows > len(df), random_state=seed).reset_index(drop=True)
+
+
+def fit_complexity(sizes, times):
+    """
+    Fit t = a + b * f(n) for each complexity class and pick the best one.
+
+    Residuals are relative to the measured time so small and large inputs
+    weigh equally. Returns the best class, its R² and R² for every class.
+    """
+    n = np.asarray(sizes, dtype=float)
+    t = np.asarray(times, dtype=float)
+    weights = 1.0 / np.maximum(t, 1e-9)
+
+    fits = {}
+    for name, func in COMPLEXITY_CLASSES:
+        feature = func(n)
+        if np.allclose(feature, 0):
+            design = np.ones((len(n), 1))
+        else:
+            design = np.column_stack([np.ones_like(n), feature])
+        coeffs, *_ = np.linalg.lstsq(design * weights[:, None], t * weights, rcond=None)
+        if len(coeffs) == 2 and coeffs[1] < 0:
+            # A negative growth term means the class does not describe the data
+            design = np.ones((len(n), 1))
+            coeffs, *_ = np.linalg.lstsq(design * weights[:, None], t * weights, rcond=None)
+
+        predicted = design @ coeffs
+        residual = np.sum(((t - predicted) * weights) ** 2)
+        total = np.sum(((t - np.average(t, weights=weights ** 2)) * weights) ** 2)
+        r_squared = 1 - residual / total if total > 0 else 1.0
+        fits[name] = {"r_squared": float(r_squared), "residual": float(residual),
+                      "coefficients": [float(c) for c in coeffs]}
+
+    slope = None
+    tail_slope = None
+    if len(n) >= 2 and np.all(t > 0):
+        slope = float(np.polyfit(np.log(n), np.log(t), 1)[0])
+        tail_slope = float(np.log(t[-1] / t[-2]) / np.log(n[-1] / n[-2]))
+
+    # Fixed overhead dominates small inputs, which can make a steep curve fit
+    # best; the growth between the two largest sizes caps the eligible classes
+    eligible = [name for name, _ in COMPLEXITY_CLASSES
+                if tail_slope is None or CLASS_EXPONENTS[name] <= tail_slope + EXPONENT_SLACK]
+
+    # With only a handful of sizes neighbouring classes fit almost equally well,
+    # so prefer the simplest class whose residual is within RESIDUAL_TOLERANCE of the best
+    best_residual = min(fits[name]["residual"] for name in eligible)
+    best = next(name for name in eligible
+                if fits[name]["residual"] <= best_residual * RESIDUAL_TOLERANCE + 1e-12)
+
+    return {"class": best, "r_squared": fits[best]["r_squared"], "loglog_slope": slope,
+            "tail_slope": tail_slope, "fits": fits}
+
+
+def _project(fit, rows):
+    func = dict(COMPLEXITY_CLASSES)[fit["class"]]
+    coeffs = fit["fits"][fit["class"]]["coefficients"]
+    value = coeffs[0]
+    if len(coeffs) == 2:
+        value += coeffs[1] * float(func(np.array([float(rows)]))[0])
+    return max(0.0, value)
+
+
+def estimate_empirical_complexity(code_obj, df, make_namespace, sizes=DEFAULT_SIZES,
+                                  time_budget=DEFAULT_TIME_BUDGET):
+    """
+    Estimate how a snippet's run time grows with the number of rows.
+
+    The snippet is timed on row-sampled copies of df at each size, smallest
+    first. Larger sizes are skipped once a run suggests the remaining budget
+    would be exceeded, and that is reported as a scaling failure. Sizes whose
+    frame would exceed MAX_SCALED_BYTES are never run and are not a failure.
+    make_namespace(frame) must build a fresh exec namespace around frame.
+    """
+    started = time.perf_counter()
+    measured_sizes = []
+    measured_times = []
+    stopped_at = None
+
+    # Wide frames reach the memory limit long before 1M rows
+    bytes_per_row = df.memory_usage(deep=True).sum() / len(df) if len(df) else 0
+    max_rows = int(MAX_SCALED_BYTES / bytes_per_row) if bytes_per_row else None
+    skipped = [rows for rows in sizes if max_rows is not None and rows > max_rows]
+    sizes = [rows for rows in sizes if rows not in skipped]
+    if skipped and max_rows > 2 * max(sizes, default=0):
+        # Still measure the largest size that fits
+        sizes.append(max_rows)
+
+    for rows in sorted(sizes):
+        remaining = time_budget - (time.perf_counter() - started)
+        if measured_times:
+            # Assume at least linear growth; each size needs a warmup plus three runs
+            expected = measured_times[-1] * rows / measured_sizes[-1]
+            if expected * 4 > remaining:
+                stopped_at = rows
+                break
+
+        frame = scaled_frame(df, rows)
+        times = benchmark(code_obj, lambda: make_namespace(frame), warmup=1, min_repeats=3,
+                          max_repeats=5, time_budget=max(remaining / 2, 0.1))
+        measured_sizes.append(rows)
+        # The fastest run is the least affected by scheduler and cache noise
+        measured_times.append(float(min(times)))
+
+    report = {
+        "sizes": measured_sizes,
+        "times": measured_times,
+        "stopped_at": stopped_at,
+        "class": "N/A",
+        "r_squared": None,
+        "loglog_slope": None,
+        "projected_rows": PROJECTION_ROWS,
+        "projected_seconds": None,
+        "scaling_risk": False,
+        "notes": []
+    }
+    if skipped:
+        report["notes"].append(
+            f"Sizes above {max_rows:,} rows skipped to stay within {MAX_SCALED_BYTES // (1024 * 1024)} MB"
+        )
+
+    if len(measured_sizes) < 3:
+        report["notes"].append("Not enough input sizes completed to fit a complexity curve")
+        if stopped_at is not None:
+            report["scaling_risk"] = True
+            report["notes"].append(f"Run time budget exhausted before {stopped_at:,} rows")
+        return report
+
+    fit = fit_complexity(measured_sizes, measured_times)
+    report.update({
+        "class": fit["class"],
+        "r_squared": fit["r_squared"],
+        "loglog_slope": fit["loglog_slope"],
+        "projected_seconds": _project(fit, PROJECTION_ROWS)
+    })
+
+    if fit["class"] in RISKY_CLASSES:
+        report["scaling_risk"] = True
+        report["notes"].append(f"Run time grows as {fit['class']} with the number of rows")
+    if stopped_at is not None:
+        report["scaling_risk"] = True
+        report["notes"].append(f"Run time budget exhausted before {stopped_at:,} rows")
+    return report
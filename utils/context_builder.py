@@ -0,0 +1,207 @@
+import re
+
+# Rough size of a token for English text and Python code; good enough for budgeting
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 1200
+# Share of the budget reserved for the column list
+COLUMN_BUDGET_SHARE = 0.4
+# Turns kept verbatim; older ones are folded into the running summary
+RECENT_TURNS = 3
+SUMMARY_MAX_TOKENS = 200
+CODE_MAX_LINES = 12
+MAX_LAST_COLUMNS = 20
+# Per summarized turn
+SUMMARY_MAX_COLUMNS = 5
+SUMMARY_MAX_OPERATIONS = 4
+SUMMARY_RESULT_CHARS = 60
+
+_WORD = re.compile(r'[A-Za-z0-9_]+')
+# Scanned separately so a key inside an f-string's other quote style is still found
+_STRINGS = (re.compile(r"'([^'\n]*)'"), re.compile(r'"([^"\n]*)"'))
+_CALL = re.compile(r'\.([A-Za-z_][A-Za-z0-9_]*)\(')
+# Calls that say nothing about what the turn computed
+_TRIVIAL_CALLS = {'copy', 'head', 'tail', 'reset_index', 'to_frame', 'to_dict', 'to_list', 'tolist',
+                  'round', 'astype', 'format', 'append', 'join', 'items', 'keys', 'values', 'get'}
+
+
+def estimate_tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+def _words(text):
+    return {word.lower() for word in _WORD.findall(text or '')}
+
+
+def _turns(messages):
+    """Pair each user message with the assistant reply that followed it."""
+    turns = []
+    for message in messages:
+        if message["role"] == "user":
+            turns.append({"question": message["content"], "code": None, "answer": None, "result": None})
+        elif turns:
+            turns[-1]["code"] = message.get("code")
+            turns[-1]["answer"] = message["content"]
+            turns[-1]["result"] = message.get("result")
+    return turns
+
+
+def rank_columns(columns, question, recent_columns=()):
+    """Columns named in the question first, then recently used ones, then the rest in order."""
+    question_lower = (question or '').lower()
+    question_words = _words(question)
+    recent = set(recent_columns)
+
+    def score(item):
+        position, column = item
+        name = str(column)
+        if name.lower() in question_lower:
+            return (0, position)
+        if _words(name) & question_words:
+            return (1, position)
+        if column in recent:
+            return (2, position)
+        return (3, position)
+
+    return [column for _, column in sorted(enumerate(columns), key=score)]
+
+
+def _select_columns(columns, question, recent_columns, budget):
+    selected = []
+    used = 0
+    for column in rank_columns(columns, question, recent_columns):
+        cost = estimate_tokens(str(column)) + 1
+        if used + cost > budget:
+            break
+        selected.append(column)
+        used += cost
+    return selected
+
+
+def _trim_code(code, question_words):
+    """The code lines most related to the question, in their original order."""
+    lines = [line for line in code.splitlines() if line.strip() and not line.startswith(('import ', 'from '))]
+    if len(lines) <= CODE_MAX_LINES:
+        return '\n'.join(lines)
+    keep = sorted(range(len(lines)), key=lambda i: (-len(_words(lines[i]) & question_words), -i))[:CODE_MAX_LINES]
+    return '\n'.join(lines[i] for i in sorted(keep))
+
+
+def _describe_result(turn):
+    """A few words on what a turn returned, without loading spilled results."""
+    result = turn["result"]
+    answer = turn["answer"] or ""
+    if result is None:
+        return "failed" if answer.startswith("❌") else None
+    if isinstance(result, str):
+        line = result.strip().splitlines()[0] if result.strip() else ""
+        return line if len(line) <= SUMMARY_RESULT_CHARS else line[:SUMMARY_RESULT_CHARS - 1] + "…"
+    if (isinstance(result, dict) and "figure" in result) or getattr(result, "kind", None) in ("png", "plotly"):
+        return "chart"
+    shape = getattr(result, "shape", None)
+    if shape is not None and len(shape) == 2:
+        return f"{shape[0]:,}×{shape[1]} table"
+    if shape is not None and len(shape) == 1:
+        return f"{shape[0]:,} values"
+    return type(result).__name__
+
+
+def _summarize_turn(turn, columns):
+    """One line per turn: the question, the columns and operations its code used, and its result."""
+    details = []
+    code = turn["code"] or ""
+    if code:
+        quoted = {text for pattern in _STRINGS for text in pattern.findall(code)}
+        used = [str(column) for column in columns if str(column) in quoted][:SUMMARY_MAX_COLUMNS]
+        if used:
+            details.append(f"columns: {', '.join(used)}")
+        operations = []
+        for name in _CALL.findall(code):
+            if name not in _TRIVIAL_CALLS and name not in operations:
+                operations.append(name)
+        if operations:
+            details.append(f"ops: {', '.join(operations[:SUMMARY_MAX_OPERATIONS])}")
+    result = _describe_result(turn)
+    if result:
+        details.append(f"result: {result}")
+    return f"- {turn['question']}" + (f" [{'; '.join(details)}]" if details else "")
+
+
+def update_summary(summary, turns, columns=()):
+    """
+    Fold turns that have left the recent window into summary, a dict
+    {"turns": n, "text": str} kept across calls so each turn is summarized
+    once. Each turn becomes one line with its question, the columns and
+    operations in its code, and a short description of its result.
+    """
+    aged_out = max(len(turns) - RECENT_TURNS, 0)
+    if aged_out <= summary["turns"]:
+        return summary
+    additions = [_summarize_turn(turn, columns) for turn in turns[summary["turns"]:aged_out]]
+    lines = (summary["text"].splitlines() if summary["text"] else []) + additions
+    # Drop the oldest turns once the summary outgrows its budget
+    while len(lines) > 1 and estimate_tokens('\n'.join(lines)) > SUMMARY_MAX_TOKENS:
+        lines.pop(0)
+    return {"turns": aged_out, "text": '\n'.join(lines)}
+
+
+def build_context(question, messages, columns, state, budget=DEFAULT_TOKEN_BUDGET):
+    """
+    Conversation and column context for one prompt within budget tokens.
+
+    state is the chat's context dict; the running summary of older turns is
+    stored in it. Returns (context_text, columns_to_show, report) where the
+    report gives the estimated tokens of each part and what was left out.
+    """
+    column_budget = int(budget * COLUMN_BUDGET_SHARE)
+    selected_columns = _select_columns(columns, question, state.get("last_columns_used", []), column_budget)
+    column_tokens = sum(estimate_tokens(str(column)) + 1 for column in selected_columns)
+
+    # The question being answered is already in the prompt
+    history = messages[:-1] if messages and messages[-1]["role"] == "user" else messages
+    turns = _turns(history)
+    summary = update_summary(state.get("summary") or {"turns": 0, "text": ""}, turns, columns)
+    state["summary"] = summary
+
+    remaining = budget - column_tokens
+    parts = ["Previous context:"]
+    if state.get("last_operation"):
+        parts.append(f"Last operation: {state['last_operation']}")
+    if state.get("last_columns_used"):
+        parts.append(f"Last used columns: {', '.join(map(str, state['last_columns_used'][:MAX_LAST_COLUMNS]))}")
+    if summary["text"]:
+        parts.append(f"Earlier turns:\n{summary['text']}")
+    remaining -= estimate_tokens('\n'.join(parts))
+
+    # Recent turns, most relevant first; questions are cheap, code only if it fits
+    question_words = _words(question)
+    recent = list(enumerate(turns[-RECENT_TURNS:]))
+    ranked = sorted(recent, key=lambda item: (-len(_words(item[1]["question"]) & question_words), -item[0]))
+    included = {}
+    dropped_turns = 0
+    for position, turn in ranked:
+        text = f"User asked: {turn['question']}"
+        if estimate_tokens(text) > remaining:
+            dropped_turns += 1
+            continue
+        remaining -= estimate_tokens(text)
+        if turn["code"]:
+            code = f"Assistant generated code: {_trim_code(turn['code'], question_words)}"
+            if estimate_tokens(code) <= remaining:
+                text += f"\n{code}"
+                remaining -= estimate_tokens(code)
+        included[position] = text
+    if included:
+        parts.append("\nRecent conversation:")
+        parts.extend(included[position] for position in sorted(included))
+
+    context = '\n'.join(parts) + '\n'
+    return context, selected_columns, {
+        "budget_tokens": budget,
+        "context_tokens": estimate_tokens(context),
+        "column_tokens": column_tokens,
+        "columns_shown": len(selected_columns),
+        "columns_omitted": len(columns) - len(selected_columns),
+        "turns_shown": len(included),
+        "turns_summarized": summary["turns"],
+        "turns_dropped": dropped_turns
+    }
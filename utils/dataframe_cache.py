@@ -0,0 +1,145 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from utils.ingestion import load_csv
+from utils.optimization import optimize_dtypes
+from utils.dataset_store import derive_key, load_dataset, save_dataset
+
+# Parsed frames are shared by every session in the process
+MAX_BYTES = int(os.getenv('DATAFRAME_CACHE_MB', '1024')) * 1024 * 1024
+HASH_CHUNK_BYTES = 8 * 1024 * 1024
+# Remembered content hashes; each is a few hundred bytes, least recently used dropped first
+MAX_HASHES = int(os.getenv('DATAFRAME_HASH_ENTRIES', '4096'))
+# Categories and parsed dates save memory but change how generated code
+# behaves on string columns, so they are opt-in
+CONVERT_STRINGS = os.getenv('DATAFRAME_CONVERT_STRINGS', '0') == '1'
+
+_lock = threading.Lock()
+_frames = OrderedDict()
+# Streamlit gives each upload a file_id (and paths have a size and mtime), so a file is only hashed once
+_hashes_by_file_id = OrderedDict()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def source_identity(source):
+    """
+    Cheap identity for a source without reading it: an upload's file_id, or
+    a server-side path with its size and modification time.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        stat = os.stat(source)
+        return f"{os.fspath(source)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return getattr(source, 'file_id', None)
+
+
+def new_digest():
+    """The digest content_hash uses, for callers that hash while reading."""
+    return hashlib.blake2b(digest_size=20)
+
+
+def remember_hash(identity, key):
+    """Record a content hash computed elsewhere, e.g. while streaming the source."""
+    if identity is None:
+        return
+    with _lock:
+        _hashes_by_file_id[identity] = key
+        _hashes_by_file_id.move_to_end(identity)
+        while len(_hashes_by_file_id) > MAX_HASHES:
+            _hashes_by_file_id.popitem(last=False)
+
+
+def _known_hash(identity):
+    if identity is None:
+        return None
+    with _lock:
+        key = _hashes_by_file_id.get(identity)
+        if key is not None:
+            _hashes_by_file_id.move_to_end(identity)
+        return key
+
+
+def content_hash(source):
+    """blake2b digest of an upload's or a file path's bytes, memoized by source_identity."""
+    identity = source_identity(source)
+    key = _known_hash(identity)
+    if key is not None:
+        return key
+
+    # Hashed outside the lock; two sessions racing on one file just agree on the key
+    digest = new_digest()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+                digest.update(block)
+    else:
+        buffer = source.getbuffer()
+        for start in range(0, len(buffer), HASH_CHUNK_BYTES):
+            digest.update(buffer[start:start + HASH_CHUNK_BYTES])
+    key = digest.hexdigest()
+
+    remember_hash(identity, key)
+    return key
+
+
+def _evict_if_needed():
+    total = sum(entry["nbytes"] for entry in _frames.values())
+    # The most recent frame is always kept, even if it alone exceeds the budget
+    while total > MAX_BYTES and len(_frames) > 1:
+        _, entry = _frames.popitem(last=False)
+        total -= entry["nbytes"]
+        _stats["evictions"] += 1
+
+
+def load_cached_csv(uploaded_file):
+    """
+    Parse and dtype-optimize an uploaded CSV (or a CSV path on the server)
+    once per distinct content; the result is also persisted to the dataset
+    store for later processes.
+
+    Returns (df, load_stats, key). The frame is shared between reruns and
+    sessions, so callers must treat it as read-only and keep their own
+    modified copies (e.g. in session state) keyed by key.
+    """
+    key = content_hash(uploaded_file)
+    if CONVERT_STRINGS:
+        # Converted frames are stored apart from the plain ones
+        key = derive_key(key, "optimize_dtypes", {"convert_strings": True})
+    with _lock:
+        entry = _frames.get(key)
+        if entry is not None:
+            _frames.move_to_end(key)
+            _stats["hits"] += 1
+            return entry["df"], dict(entry["stats"], cached=True), key
+
+    # Load outside the lock so other sessions are not blocked meanwhile.
+    # Files seen by an earlier process are memory-mapped from the dataset store
+    df, stats = load_dataset(key)
+    if df is None:
+        df, stats = load_csv(uploaded_file)
+        df, optimization = optimize_dtypes(df, convert_strings=CONVERT_STRINGS)
+        stats = dict(stats, memory_bytes=optimization["memory_after"], optimization=optimization)
+        save_dataset(key, df, source_stats=stats)
+    with _lock:
+        _stats["misses"] += 1
+        _frames[key] = {"df": df, "stats": stats, "nbytes": stats["memory_bytes"]}
+        _frames.move_to_end(key)
+        _evict_if_needed()
+    return df, dict(stats, cached=False), key
+
+
+def get_dataframe_cache_stats():
+    with _lock:
+        return dict(
+            _stats,
+            entries=len(_frames),
+            bytes=sum(entry["nbytes"] for entry in _frames.values()),
+            max_bytes=MAX_BYTES
+        )
+
+
+def clear_dataframe_cache():
+    with _lock:
+        _frames.clear()
+        _hashes_by_file_id.clear()
@@ -0,0 +1,261 @@
+import hashlib
+import json
+import os
+import threading
+import shutil
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+
+STORE_DIR = os.getenv(
+    'DATASET_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.data_store')
+)
+# Whole entries (data, manifest and exports) are evicted least recently used first
+MAX_STORE_BYTES = int(os.getenv('DATASET_STORE_MB', '4096')) * 1024 * 1024
+DATA_FILE = 'data.feather'
+MANIFEST_FILE = 'manifest.json'
+EXPORT_DIR = 'exports'
+# Written once an entry's files are complete; its mtime records the last use
+USED_FILE = 'last_used'
+# Directories without a marker this old are left over from interrupted writes
+ORPHAN_GRACE_SECONDS = 3600
+# Bumped when stored frames change meaning; older entries are ignored
+STORE_FORMAT = 3
+
+_write_lock = threading.Lock()
+_evict_lock = threading.Lock()
+
+
+def is_available():
+    return pa is not None
+
+
+def derive_key(parent_key, step, params=None):
+    """Key for a frame produced by applying step(params) to the frame stored under parent_key."""
+    payload = json.dumps([parent_key, step, params or {}], sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=20).hexdigest()
+
+
+def _dataset_dir(key):
+    return os.path.join(STORE_DIR, key[:2], key)
+
+
+def _atomic_write(path, write):
+    """Write through a temp file so readers never see a partial file."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _column_stats(column):
+    stats = {"null_count": column.null_count}
+    column_type = column.type
+    if pa.types.is_integer(column_type) or pa.types.is_floating(column_type) or \
+       pa.types.is_temporal(column_type):
+        try:
+            bounds = pc.min_max(column)
+            stats["min"] = bounds["min"].as_py()
+            stats["max"] = bounds["max"].as_py()
+        except (pa.ArrowNotImplementedError, pa.ArrowInvalid):
+            pass
+    return stats
+
+
+def _touch(key):
+    """Mark an entry as recently used; the marker's mtime orders eviction."""
+    try:
+        with open(os.path.join(_dataset_dir(key), USED_FILE), 'a'):
+            pass
+        os.utime(os.path.join(_dataset_dir(key), USED_FILE), None)
+    except OSError:
+        pass
+
+
+def _entry_size(directory):
+    total = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+def _evict_store(keep_key=None):
+    """Remove least recently used entries until the store fits MAX_STORE_BYTES."""
+    # One eviction pass at a time; a concurrent caller's write is covered by the running pass
+    if not _evict_lock.acquire(blocking=False):
+        return
+    try:
+        entries = []
+        total = 0
+        for prefix in os.listdir(STORE_DIR):
+            prefix_dir = os.path.join(STORE_DIR, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                directory = os.path.join(prefix_dir, key)
+                try:
+                    mtime = os.path.getmtime(os.path.join(directory, USED_FILE))
+                except OSError:
+                    # Entries still being written have no marker yet; older
+                    # ones were interrupted and are evicted by their own age
+                    try:
+                        mtime = os.path.getmtime(directory)
+                    except OSError:
+                        continue
+                    if time.time() - mtime < ORPHAN_GRACE_SECONDS:
+                        continue
+                size = _entry_size(directory)
+                entries.append((mtime, size, key, directory))
+                total += size
+
+        entries.sort()
+        for _, size, key, directory in entries:
+            if total <= MAX_STORE_BYTES:
+                break
+            if key == keep_key:
+                continue
+            shutil.rmtree(directory, ignore_errors=True)
+            try:
+                # Drop the prefix directory once its last entry is gone
+                os.rmdir(os.path.dirname(directory))
+            except OSError:
+                pass
+            total -= size
+    except OSError:
+        pass
+    finally:
+        _evict_lock.release()
+
+
+def save_dataset(key, df, source_stats=None):
+    """
+    Persist df as an uncompressed Feather file plus a manifest with schema,
+    row count and per-column statistics. Returns the manifest, or None if
+    pyarrow is missing or the frame has columns Arrow cannot represent.
+    """
+    if pa is None:
+        return None
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # e.g. object columns mixing strings and numbers
+        return None
+
+    directory = _dataset_dir(key)
+    with _write_lock:
+        os.makedirs(directory, exist_ok=True)
+        data_path = os.path.join(directory, DATA_FILE)
+        # Uncompressed so later reads can memory-map the buffers directly
+        _atomic_write(data_path, lambda path: feather.write_feather(table, path, compression='uncompressed'))
+
+        manifest = {
+            "key": key,
+            "format": STORE_FORMAT,
+            "rows": table.num_rows,
+            "columns": [
+                {"name": str(name), "arrow_type": str(field.type), "pandas_dtype": str(df[name].dtype),
+                 **_column_stats(table.column(position))}
+                for position, (name, field) in enumerate(zip(df.columns, table.schema))
+            ],
+            "data_bytes": os.path.getsize(data_path),
+            "source": source_stats or {},
+            "created": time.time()
+        }
+        # The manifest is written last, so its presence marks a complete entry
+        _atomic_write(
+            os.path.join(directory, MANIFEST_FILE),
+            lambda path: _write_json(path, manifest)
+        )
+        _touch(key)
+    _evict_store(keep_key=key)
+    return manifest
+
+
+def _write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, default=str)
+
+
+def load_manifest(key):
+    try:
+        with open(os.path.join(_dataset_dir(key), MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _string_types_mapper(arrow_type):
+    # Without this, strings come back as Python objects instead of Arrow strings
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    return None
+
+
+def load_dataset(key):
+    """
+    Memory-map a stored dataset. Returns (df, stats) in the same shape as
+    ingestion.load_csv, or (None, None) if the key is not stored.
+    """
+    if pa is None:
+        return None, None
+    manifest = load_manifest(key)
+    # Older entries may hold integers downcast below int32 (format 1) or
+    # strings converted to categories (format 2)
+    if manifest is None or manifest.get("format") != STORE_FORMAT:
+        return None, None
+
+    started = time.perf_counter()
+    try:
+        source = pa.memory_map(os.path.join(_dataset_dir(key), DATA_FILE), 'r')
+        table = pa.ipc.open_file(source).read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None, None
+    # pandas metadata restores the other dtypes; Arrow-backed columns
+    # keep pointing at the mapped file instead of being copied
+    df = table.to_pandas(split_blocks=True, types_mapper=_string_types_mapper)
+    seconds = time.perf_counter() - started
+    _touch(key)
+
+    return df, {
+        "engine": "memory-mapped feather",
+        "rows": len(df),
+        "columns": df.shape[1],
+        "file_bytes": manifest["data_bytes"],
+        "memory_bytes": int(df.memory_usage(deep=True).sum()),
+        "seconds": seconds,
+        "mb_per_second": manifest["data_bytes"] / 1024 / 1024 / seconds if seconds > 0 else None
+    }
+
+
+def export_csv(key, df):
+    """
+    Write df as CSV under the dataset store once per key and return the path,
+    so downloads stream a file instead of rebuilding a CSV string every rerun.
+    Export-only entries count towards MAX_STORE_BYTES like saved ones.
+    """
+    directory = os.path.join(_dataset_dir(key), EXPORT_DIR)
+    path = os.path.join(directory, 'data.csv')
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        _atomic_write(path, lambda tmp_path: df.to_csv(tmp_path, index=False))
+        # Derived frames are never saved, so the export may be the entry's only file
+        _touch(key)
+        _evict_store(keep_key=key)
+    else:
+        _touch(key)
+    return path
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+
+def _as_float(values):
+    """Numeric, datetime or timedelta values as float64 positions."""
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values) or pd.api.types.is_timedelta64_dtype(values):
+        return values.astype('int64').to_numpy(dtype=np.float64)
+    return values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the sorted positions of at most threshold points that keep the
+    visual shape of the series: the first and last points, plus, from every
+    bucket in between, the point forming the largest triangle with the point
+    kept from the previous bucket and the mean of the next bucket. x must be
+    in plotting order; NaNs are not allowed.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Bucket boundaries for the n - 2 interior points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    # Means of every bucket, used as the third triangle vertex
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    mean_x = np.append(sums_x / sizes, x[-1])
+    mean_y = np.append(sums_y / sizes, y[-1])
+
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_x, next_y = mean_x[bucket + 1], mean_y[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((ax - next_x) * (y[start:stop] - ay) - (ax - x[start:stop]) * (next_y - ay))
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample_frame(df, x, y_columns, threshold):
+    """
+    Rows of df kept by LTTB for each of y_columns (their union), in the
+    original order. x is a column name or None for row order.
+    """
+    if len(df) <= threshold:
+        return df
+    if x is None or x not in df.columns:
+        positions = np.arange(len(df), dtype=np.float64)
+    else:
+        positions = _as_float(df[x])
+        # Unsorted or missing x values cannot be bucketed; fall back to row order
+        if np.isnan(positions).any() or np.any(np.diff(positions) < 0):
+            positions = np.arange(len(df), dtype=np.float64)
+
+    keep = []
+    # Each series gets an equal share of the budget
+    per_series = max(threshold // max(len(y_columns), 1), 3)
+    for column in y_columns:
+        values = _as_float(df[column])
+        valid = np.flatnonzero(~np.isnan(values))
+        chosen = lttb(positions[valid], values[valid], per_series)
+        keep.append(valid[chosen])
+    rows = np.unique(np.concatenate(keep)) if keep else np.arange(0)
+    return df.iloc[rows]
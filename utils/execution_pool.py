@@ -0,0 +1,480 @@
+import os
+import time
+import queue
+import pickle
+import weakref
+import itertools
+import threading
+import traceback
+import multiprocessing as mp
+from collections import OrderedDict
+
+from utils.shared_frame import SharedFrame, attach_shared_frame, is_available as shared_frame_available
+
+DEFAULT_POOL_SIZE = int(os.getenv('EXEC_POOL_SIZE', '2'))
+DEFAULT_TIMEOUT = float(os.getenv('EXEC_TIMEOUT_SECONDS', '30'))
+DEFAULT_MEMORY_LIMIT_MB = int(os.getenv('EXEC_MEMORY_LIMIT_MB', '2048'))
+# Time allowed for a worker to receive a new DataFrame after an upload
+LOAD_TIMEOUT = float(os.getenv('EXEC_LOAD_TIMEOUT_SECONDS', '300'))
+# Number of distinct DataFrames each worker keeps loaded at once
+WORKER_DATASET_SLOTS = 2
+POLL_INTERVAL = 0.05
+
+# Modules imported once in the fork server so every worker starts warm
+PRELOAD_MODULES = ['pandas', 'numpy', 'utils.visualization']
+
+
+class ExecutionError(RuntimeError):
+    """Raised when a snippet fails inside a worker."""
+
+
+class ExecutionTimeout(ExecutionError):
+    """Raised when a snippet exceeds its wall-clock limit."""
+
+
+class ExecutionMemoryError(ExecutionError):
+    """Raised when a worker exceeds its RSS limit."""
+
+
+def strip_comments(code):
+    """Drop blank lines and full-line comments, as the inline exec calls used to."""
+    return '\n'.join(
+        line for line in code.split('\n')
+        if line.strip() and not line.strip().startswith('#')
+    )
+
+
+def _rss_bytes(pid):
+    """Resident set size of a process, or None where /proc is unavailable."""
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+def _build_namespace(df):
+    import pandas as pd
+    import numpy as np
+    from utils.visualization import create_plot
+
+    return {
+        'df': df.copy(deep=False) if df is not None else None,
+        'pd': pd,
+        'np': np,
+        'create_plot': create_plot,
+        'result': None
+    }
+
+
+class DatasetNotLoaded(LookupError):
+    """Raised in a worker when a job names a dataset the worker no longer holds."""
+
+
+def _dataset(state, token):
+    """The worker's frame for token, marked most recently used; the worker's order decides eviction."""
+    if token is None:
+        return None
+    datasets = state['datasets']
+    if token not in datasets:
+        raise DatasetNotLoaded(f"Dataset {token} is not loaded in this worker")
+    datasets.move_to_end(token)
+    return datasets[token]
+
+
+def _handle_load(state, job):
+    datasets = state['datasets']
+    handles = state['handles']
+    token = job['token']
+
+    if 'manifest' in job:
+        df, handles[token] = attach_shared_frame(job['manifest'])
+    else:
+        df = job['df']
+    datasets[token] = df
+    datasets.move_to_end(token)
+
+    while len(datasets) > WORKER_DATASET_SLOTS:
+        evicted, _ = datasets.popitem(last=False)
+        handle = handles.pop(evicted, None)
+        if handle is not None:
+            handle.close()
+    return {'ok': True}
+
+
+def _handle_exec(state, job):
+    df = _dataset(state, job['token'])
+    namespace = _build_namespace(df)
+    code_obj = compile(strip_comments(job['code']), '<generated>', 'exec')
+    exec(code_obj, namespace)
+    return {'ok': True, 'result': namespace.get('result')}
+
+
+def _handle_benchmark(state, job):
+    from utils.benchmark import benchmark, summarize_timings
+
+    df = _dataset(state, job['token'])
+    code_obj = compile(strip_comments(job['code']), '<generated>', 'exec')
+    times = benchmark(code_obj, lambda: _build_namespace(df), **job.get('options', {}))
+    return {'ok': True, 'times': times, 'stats': summarize_timings(times)}
+
+
+def _handle_memory(state, job):
+    from utils.memory_profiler import profile_memory
+
+    df = _dataset(state, job['token'])
+    source = strip_comments(job['code'])
+    code_obj = compile(source, '<generated>', 'exec')
+    return {'ok': True, 'profile': profile_memory(code_obj, lambda: _build_namespace(df), source)}
+
+
+def _handle_complexity(state, job):
+    from utils.complexity import estimate_empirical_complexity
+
+    df = _dataset(state, job['token'])
+    code_obj = compile(strip_comments(job['code']), '<generated>', 'exec')
+    report = estimate_empirical_complexity(code_obj, df, _build_namespace, **job.get('options', {}))
+    return {'ok': True, 'report': report}
+
+
+_JOB_HANDLERS = {
+    'load': _handle_load,
+    'exec': _handle_exec,
+    'benchmark': _handle_benchmark,
+    'memory': _handle_memory,
+    'complexity': _handle_complexity,
+}
+
+
+def _worker_main(conn):
+    """Worker loop: receive a job, run its handler, send back the payload."""
+    import pandas as pd
+
+    # Shared columns are read-only; copy-on-write makes a snippet that writes
+    # to a column copy only that column instead of failing
+    pd.set_option('mode.copy_on_write', True)
+    state = {'datasets': OrderedDict(), 'handles': {}}
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+
+        if job.get('kind') == 'shutdown':
+            break
+
+        try:
+            handler = _JOB_HANDLERS[job['kind']]
+            payload = handler(state, job)
+        except Exception as e:
+            payload = {
+                'ok': False,
+                'error': str(e),
+                'error_type': type(e).__name__,
+                'traceback': traceback.format_exc()
+            }
+
+        try:
+            conn.send_bytes(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception as e:
+            conn.send_bytes(pickle.dumps({
+                'ok': False,
+                'error': f"Result could not be transferred: {str(e)}",
+                'error_type': type(e).__name__
+            }))
+
+
+# ---------------------------------------------------------------------------
+# Parent side
+# ---------------------------------------------------------------------------
+
+def _get_context():
+    methods = mp.get_all_start_methods()
+    if 'forkserver' in methods:
+        ctx = mp.get_context('forkserver')
+        ctx.set_forkserver_preload(PRELOAD_MODULES)
+        return ctx
+    return mp.get_context('spawn')
+
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        # Mirror of the worker's LRU, only used to skip needless loads; the
+        # worker reports DatasetNotLoaded when the two disagree
+        self.loaded = OrderedDict()
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.join(timeout=5)
+        except Exception:
+            pass
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+    def shutdown(self):
+        try:
+            self.conn.send({'kind': 'shutdown'})
+            self.process.join(timeout=2)
+        except Exception:
+            pass
+        if self.process.is_alive():
+            self.kill()
+
+
+class ExecutionPool:
+    """
+    Pool of pre-started worker processes that execute generated code.
+
+    Each DataFrame is placed in shared memory once and workers attach to it
+    read-only, so a dataset is never pickled per snippet. Snippets run
+    under a wall-clock timeout and an RSS cap; a worker that breaches either
+    is killed and replaced.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB):
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.memory_limit_bytes = memory_limit_mb * 1024 * 1024 if memory_limit_mb else None
+        self._ctx = _get_context()
+        self._idle = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._closed = False
+        # DataFrames are unhashable, so tokens are tracked by id() and a weakref
+        self._tokens = {}
+        self._frames = weakref.WeakValueDictionary()
+        self._shared = {}
+        self._token_counter = itertools.count(1)
+
+        for _ in range(self.size):
+            self._add_worker()
+
+    def _add_worker(self):
+        worker = _Worker(self._ctx)
+        with self._lock:
+            self._workers.append(worker)
+        self._idle.put(worker)
+
+    def _replace_worker(self, worker):
+        worker.kill()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        if not self._closed:
+            self._add_worker()
+
+    def register_dataframe(self, df):
+        """Return the token identifying df in the workers."""
+        key = id(df)
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is not None and entry[0]() is df:
+                return entry[1]
+
+            token = next(self._token_counter)
+
+            def _forget(_, key=key, token=token):
+                current = self._tokens.get(key)
+                if current is not None and current[1] == token:
+                    self._tokens.pop(key, None)
+                shared = self._shared.pop(token, None)
+                if shared is not None:
+                    shared.close()
+
+            self._tokens[key] = (weakref.ref(df, _forget), token)
+            self._frames[token] = df
+            return token
+
+    def _wait(self, worker, timeout):
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            if worker.conn.poll(POLL_INTERVAL):
+                return pickle.loads(worker.conn.recv_bytes())
+            if not worker.is_alive():
+                raise ExecutionError("Execution worker exited unexpectedly")
+            if self.memory_limit_bytes:
+                rss = _rss_bytes(worker.process.pid)
+                if rss is not None and rss > self.memory_limit_bytes:
+                    raise ExecutionMemoryError(
+                        f"Execution exceeded the memory limit of {self.memory_limit_bytes // (1024 * 1024)} MB"
+                    )
+            if deadline is not None and time.monotonic() > deadline:
+                raise ExecutionTimeout(f"Execution timed out after {timeout:g} seconds")
+
+    def _share(self, token, df):
+        """Place df in shared memory once and return its manifest, or None to pickle."""
+        with self._lock:
+            shared = self._shared.get(token)
+            if shared is None and shared_frame_available():
+                try:
+                    shared = SharedFrame(df)
+                except (OSError, ValueError):
+                    return None
+                self._shared[token] = shared
+        return shared.manifest if shared is not None else None
+
+    def _ensure_loaded(self, worker, token):
+        if token is None or token in worker.loaded:
+            if token is not None:
+                worker.loaded.move_to_end(token)
+            return
+        df = self._frames.get(token)
+        if df is None:
+            return
+        manifest = self._share(token, df)
+        if manifest is not None:
+            worker.conn.send({'kind': 'load', 'token': token, 'manifest': manifest})
+        else:
+            worker.conn.send({'kind': 'load', 'token': token, 'df': df})
+        payload = self._wait(worker, max(LOAD_TIMEOUT, self.timeout or 0))
+        if not payload.get('ok'):
+            raise ExecutionError(payload.get('error', 'Failed to load data in worker'))
+        worker.loaded[token] = True
+        while len(worker.loaded) > WORKER_DATASET_SLOTS:
+            worker.loaded.popitem(last=False)
+
+    def submit(self, job, df=None, timeout=None):
+        """Run a job on an idle worker and return its payload."""
+        if self._closed:
+            raise ExecutionError("Execution pool has been shut down")
+
+        token = self.register_dataframe(df) if df is not None else None
+        job = dict(job, token=token)
+        timeout = self.timeout if timeout is None else timeout
+
+        worker = self._idle.get()
+        healthy = True
+        try:
+            self._ensure_loaded(worker, token)
+            worker.conn.send(job)
+            payload = self._wait(worker, timeout)
+            if payload.get('error_type') == DatasetNotLoaded.__name__:
+                # The worker evicted the frame; its view wins, so reload and retry once
+                worker.loaded.pop(token, None)
+                self._ensure_loaded(worker, token)
+                worker.conn.send(job)
+                payload = self._wait(worker, timeout)
+            return payload
+        except (ExecutionError, OSError, EOFError):
+            healthy = False
+            raise
+        finally:
+            if healthy and worker.is_alive():
+                self._idle.put(worker)
+            else:
+                self._replace_worker(worker)
+
+    def execute(self, code, df=None, timeout=None):
+        """Execute a snippet against df and return its `result` variable."""
+        payload = self.submit({'kind': 'exec', 'code': code}, df=df, timeout=timeout)
+        if not payload.get('ok'):
+            raise ExecutionError(payload.get('error', 'Unknown execution error'))
+        return payload.get('result')
+
+    def benchmark(self, code, df=None, timeout=None, **options):
+        """
+        Time a snippet inside a worker, away from the Streamlit process.
+
+        Returns a dict with the raw run times and their summary statistics.
+        """
+        from utils.benchmark import DEFAULT_TIME_BUDGET
+
+        if timeout is None:
+            timeout = self.timeout + options.get('time_budget', DEFAULT_TIME_BUDGET)
+        payload = self.submit({'kind': 'benchmark', 'code': code, 'options': options},
+                              df=df, timeout=timeout)
+        if not payload.get('ok'):
+            raise ExecutionError(payload.get('error', 'Unknown benchmark error'))
+        return {'times': payload['times'], 'stats': payload['stats']}
+
+    def profile_memory(self, code, df=None, timeout=None):
+        """
+        Profile a snippet's memory inside a worker, separately from timing.
+
+        Returns peak RSS growth, Arrow and NumPy buffer bytes, Python object
+        bytes and per-line allocation hot spots.
+        """
+        timeout = self.timeout * 3 if timeout is None else timeout
+        payload = self.submit({'kind': 'memory', 'code': code}, df=df, timeout=timeout)
+        if not payload.get('ok'):
+            raise ExecutionError(payload.get('error', 'Unknown memory profiling error'))
+        return payload['profile']
+
+    def estimate_complexity(self, code, df=None, timeout=None, **options):
+        """
+        Fit a snippet's run time on row-sampled copies of df to complexity classes.
+
+        Returns the fitted class, goodness of fit and any scaling warnings.
+        """
+        from utils.complexity import DEFAULT_TIME_BUDGET
+
+        if timeout is None:
+            timeout = self.timeout + options.get('time_budget', DEFAULT_TIME_BUDGET) * 2
+        payload = self.submit({'kind': 'complexity', 'code': code, 'options': options},
+                              df=df, timeout=timeout)
+        if not payload.get('ok'):
+            raise ExecutionError(payload.get('error', 'Unknown complexity estimation error'))
+        return payload['report']
+
+    def shutdown(self):
+        self._closed = True
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.shutdown()
+        with self._lock:
+            shared_frames = list(self._shared.values())
+            self._shared.clear()
+        for shared in shared_frames:
+            shared.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_execution_pool():
+    """Return the process-wide execution pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._closed:
+            _pool = ExecutionPool()
+        return _pool
+
+
+def execute_code(code, df, timeout=None):
+    """Execute generated code in an isolated worker and return its `result`."""
+    return get_execution_pool().execute(code, df=df, timeout=timeout)
+
+
+def benchmark_code(code, df, timeout=None, **options):
+    """Benchmark generated code in an isolated worker."""
+    return get_execution_pool().benchmark(code, df=df, timeout=timeout, **options)
+
+
+def profile_memory_usage(code, df, timeout=None):
+    """Profile generated code's memory use in an isolated worker."""
+    return get_execution_pool().profile_memory(code, df=df, timeout=timeout)
+
+
+def estimate_code_complexity(code, df, timeout=None, **options):
+    """Empirically estimate generated code's complexity in an isolated worker."""
+    return get_execution_pool().estimate_complexity(code, df=df, timeout=timeout, **options)
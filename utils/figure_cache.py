@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+from utils import rendering, visualization
+
+CACHE_DIR = os.getenv(
+    'FIGURE_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'figures')
+)
+MAX_MEMORY_BYTES = int(os.getenv('FIGURE_CACHE_MB', '64')) * 1024 * 1024
+MAX_DISK_BYTES = int(os.getenv('FIGURE_CACHE_DISK_MB', '256')) * 1024 * 1024
+
+_lock = threading.Lock()
+# key -> pickled entry; entries hold encoded figures, never live figure objects
+_entries = OrderedDict()
+_stats = {"hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+# Disk writes and eviction; kept apart from _lock so lookups never wait on a directory scan
+_disk_lock = threading.Lock()
+# Running size of the disk tier, measured by one scan on first write
+_disk_bytes = None
+
+
+def data_hash(data):
+    """Content hash of a frame or series, for data without a dataset key."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy(dtype=np.uint64).tobytes())
+    if isinstance(data, pd.DataFrame):
+        digest.update(json.dumps([str(c) for c in data.columns] + [str(d) for d in data.dtypes]).encode())
+    return digest.hexdigest()
+
+
+def make_figure_key(dataset_key, plot_type, x, y, title, settings):
+    """Hash of the dataset version, the plot spec and everything that changes the rendered output."""
+    payload = json.dumps({
+        "dataset": dataset_key,
+        "plot": [plot_type, x, y, title],
+        "settings": settings,
+        "render": [rendering.DEFAULT_DPI, rendering.FACE_COLOR, visualization.MAX_LINE_POINTS,
+                   visualization.MAX_SCATTER_POINTS, visualization.MAX_BOX_POINTS,
+                   visualization.MAX_BAR_CATEGORIES, visualization.DENSITY_BINS,
+                   visualization.THUMBNAIL_LINE_POINTS, visualization.THUMBNAIL_SCATTER_POINTS,
+                   visualization.THUMBNAIL_BOX_POINTS, visualization.THUMBNAIL_DENSITY_BINS,
+                   visualization.THUMBNAIL_FIGSIZE, visualization.THUMBNAIL_DPI]
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _entry_path(key):
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.pkl")
+
+
+def _encode(plot):
+    """PNGs stay base64 text; Plotly figures are stored as their JSON."""
+    figure = plot['figure']
+    entry = dict(plot)
+    if isinstance(figure, str):
+        entry['figure'], entry['format'] = figure, 'png'
+    else:
+        entry['figure'], entry['format'] = pio.to_json(figure), 'plotly'
+    return pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _decode(blob):
+    entry = pickle.loads(blob)
+    if entry.pop('format') == 'plotly':
+        entry['figure'] = pio.from_json(entry['figure'])
+    return entry
+
+
+def _remember(key, blob):
+    """Insert into the memory tier; caller holds _lock."""
+    _entries[key] = blob
+    _entries.move_to_end(key)
+    total = sum(len(value) for value in _entries.values())
+    while total > MAX_MEMORY_BYTES and len(_entries) > 1:
+        _, evicted = _entries.popitem(last=False)
+        total -= len(evicted)
+        _stats["evictions"] += 1
+
+
+def _scan_disk():
+    """(mtime, size, path) of every entry on disk; caller holds _disk_lock."""
+    entries = []
+    for root, _, files in os.walk(CACHE_DIR):
+        for name in files:
+            if not name.endswith('.pkl'):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+
+def _evict_disk():
+    """Remove the least recently used entries until under MAX_DISK_BYTES; caller holds _disk_lock."""
+    entries = sorted(_scan_disk())
+    total_bytes = sum(size for _, size, _ in entries)
+    evicted = 0
+    while entries and total_bytes > MAX_DISK_BYTES:
+        _, size, path = entries.pop(0)
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total_bytes -= size
+        evicted += 1
+    with _lock:
+        _stats["evictions"] += evicted
+    return total_bytes
+
+
+def get_cached_figure(key):
+    """Return the cached create_plot result for key, or None on a miss."""
+    with _lock:
+        blob = _entries.get(key)
+        if blob is not None:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+        else:
+            path = _entry_path(key)
+            try:
+                with open(path, 'rb') as f:
+                    blob = f.read()
+                os.utime(path, None)
+            except OSError:
+                _stats["misses"] += 1
+                return None
+            _stats["disk_hits"] += 1
+            _remember(key, blob)
+    return _decode(blob)
+
+
+def set_cached_figure(key, plot):
+    """Store a create_plot result in memory and on disk."""
+    global _disk_bytes
+    blob = _encode(plot)
+    path = _entry_path(key)
+    with _lock:
+        _remember(key, blob)
+
+    with _disk_lock:
+        if _disk_bytes is None:
+            _disk_bytes = sum(size for _, size, _ in _scan_disk())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            replaced = os.path.getsize(path) if os.path.exists(path) else 0
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        _disk_bytes += len(blob) - replaced
+        with _lock:
+            _stats["writes"] += 1
+        # Only scan the directory when the running total says the budget is exceeded
+        if _disk_bytes > MAX_DISK_BYTES:
+            _disk_bytes = _evict_disk()
+
+
+def cached_plot(plot_type, data, x=None, y=None, title=None, dataset_key=None, **settings):
+    """
+    create_plot with caching. dataset_key identifies the version of data
+    (e.g. the session's df_key); without one the data is hashed, which is
+    still far cheaper than a render. Returns create_plot's result, with
+    render_stats['cached'] set.
+    """
+    if dataset_key is None:
+        dataset_key = data_hash(data)
+    key = make_figure_key(dataset_key, plot_type, x, y, title, settings)
+    plot = get_cached_figure(key)
+    if plot is not None:
+        plot.setdefault('render_stats', {})['cached'] = True
+        return plot
+
+    plot = visualization.create_plot(plot_type, data, x=x, y=y, title=title, **settings)
+    set_cached_figure(key, plot)
+    plot['render_stats']['cached'] = False
+    return plot
+
+
+def get_figure_cache_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats["entries"] = len(_entries)
+        stats["memory_bytes"] = sum(len(value) for value in _entries.values())
+    lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+    stats["hit_rate"] = (stats["hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+    return stats
+
+
+def clear_figure_cache():
+    """Drop both tiers and reset the counters."""
+    global _disk_bytes
+    with _disk_lock:
+        with _lock:
+            _entries.clear()
+        for _, _, path in _scan_disk():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        _disk_bytes = 0
+        with _lock:
+            for counter in _stats:
+                _stats[counter] = 0
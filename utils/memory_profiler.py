@@ -0,0 +1,193 @@
+import gc
+import os
+import sys
+import threading
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+SAMPLE_INTERVAL = 0.001
+TRACEBACK_DEPTH = 25
+TOP_LINES = 5
+SNIPPET_FILENAME = '<generated>'
+PAGE_SIZE = 4096
+
+# NumPy reports its data buffers to tracemalloc under a dedicated domain
+NUMPY_DOMAIN = getattr(getattr(np, 'lib', None), 'tracemalloc_domain', 389047)
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None if unavailable."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _arrow_bytes_allocated():
+    pa = sys.modules.get('pyarrow')
+    if pa is None:
+        return None
+    try:
+        return pa.default_memory_pool().bytes_allocated()
+    except Exception:
+        return None
+
+
+class _PeakSampler(threading.Thread):
+    """Polls RSS and Arrow pool usage in the background and keeps the maximum."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self._stop_event = threading.Event()
+        self.peak_rss = current_rss()
+        self.peak_arrow = _arrow_bytes_allocated()
+
+    def _sample(self):
+        rss = current_rss()
+        if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+            self.peak_rss = rss
+        arrow = _arrow_bytes_allocated()
+        if arrow is not None and (self.peak_arrow is None or arrow > self.peak_arrow):
+            self.peak_arrow = arrow
+
+    def run(self):
+        while not self._stop_event.wait(SAMPLE_INTERVAL):
+            self._sample()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self._sample()
+
+
+def _touch_buffer(values):
+    """Read one byte per page of a 1-D NumPy array or an Arrow buffer."""
+    raw = values if isinstance(values, np.ndarray) else np.frombuffer(values, dtype=np.uint8)
+    if raw.size == 0:
+        return
+    if raw.flags.c_contiguous:
+        raw, step = raw.view(np.uint8), PAGE_SIZE
+    else:
+        step = max(1, PAGE_SIZE // raw.itemsize)
+    int(raw[::step].sum())
+
+
+def _touch_pages(df):
+    """
+    Fault in every page of a (possibly shared-memory) frame, so the first
+    profile on a worker does not count mapping the dataset as the snippet's
+    own RSS growth.
+    """
+    if df is None:
+        return
+    pa = sys.modules.get('pyarrow')
+    for _, series in df.items():
+        values = series.array
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            _touch_buffer(np.asarray(values.codes))
+        elif pa is not None and isinstance(series.dtype, pd.ArrowDtype):
+            for chunk in values.__arrow_array__().chunks:
+                for buffer in chunk.buffers():
+                    if buffer is not None:
+                        _touch_buffer(buffer)
+        else:
+            array = series.to_numpy(copy=False)
+            if not array.dtype.hasobject:
+                _touch_buffer(array)
+
+
+def _measure_rss(code_obj, make_namespace):
+    """Untraced run: peak RSS and Arrow pool growth over the baseline."""
+    namespace = make_namespace()
+    _touch_pages(namespace.get('df'))
+    gc.collect()
+    baseline_rss = current_rss()
+    baseline_arrow = _arrow_bytes_allocated()
+
+    sampler = _PeakSampler()
+    sampler.start()
+    try:
+        exec(code_obj, namespace)
+    finally:
+        sampler.stop()
+
+    peak_rss_delta = None
+    if baseline_rss is not None and sampler.peak_rss is not None:
+        peak_rss_delta = max(0, sampler.peak_rss - baseline_rss)
+    arrow_peak_bytes = None
+    if baseline_arrow is not None and sampler.peak_arrow is not None:
+        arrow_peak_bytes = max(0, sampler.peak_arrow - baseline_arrow)
+    return peak_rss_delta, arrow_peak_bytes
+
+
+def _snippet_line(traceback):
+    for frame in traceback:
+        if frame.filename == SNIPPET_FILENAME:
+            return frame.lineno
+    return None
+
+
+def _measure_traced(code_obj, make_namespace, source_lines):
+    """Traced run: Python object vs NumPy buffer bytes and per-line hot spots."""
+    namespace = make_namespace()
+    gc.collect()
+
+    tracemalloc.start(TRACEBACK_DEPTH)
+    try:
+        exec(code_obj, namespace)
+        _, traced_peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    python_bytes = 0
+    numpy_bytes = 0
+    per_line = {}
+    for trace in snapshot.traces:
+        if trace.domain == NUMPY_DOMAIN:
+            numpy_bytes += trace.size
+        else:
+            python_bytes += trace.size
+
+        lineno = _snippet_line(trace.traceback)
+        if lineno is not None:
+            entry = per_line.setdefault(lineno, {"bytes": 0, "allocations": 0})
+            entry["bytes"] += trace.size
+            entry["allocations"] += 1
+
+    hot_spots = [
+        {
+            "line": lineno,
+            "source": source_lines[lineno - 1].strip() if 0 < lineno <= len(source_lines) else "",
+            "bytes": stats["bytes"],
+            "allocations": stats["allocations"]
+        }
+        for lineno, stats in sorted(per_line.items(), key=lambda item: item[1]["bytes"], reverse=True)[:TOP_LINES]
+    ]
+    return traced_peak, python_bytes, numpy_bytes, hot_spots
+
+
+def profile_memory(code_obj, make_namespace, source):
+    """
+    Profile the memory behaviour of a compiled snippet.
+
+    The first run is untraced and records peak RSS growth and Arrow pool
+    growth, so tracemalloc overhead does not distort it. The second run is
+    under tracemalloc. It splits the bytes still held at the end into Python
+    objects and NumPy buffers, and attributes them to snippet lines.
+    """
+    peak_rss_delta, arrow_peak_bytes = _measure_rss(code_obj, make_namespace)
+    traced_peak, python_bytes, numpy_bytes, hot_spots = _measure_traced(
+        code_obj, make_namespace, source.split('\n')
+    )
+    return {
+        "peak_rss_delta": peak_rss_delta,
+        "arrow_peak_bytes": arrow_peak_bytes,
+        "numpy_buffer_bytes": numpy_bytes,
+        "python_object_bytes": python_bytes,
+        "traced_peak_bytes": traced_peak,
+        "hot_spots": hot_spots
+    }
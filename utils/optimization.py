@@ -0,0 +1,129 @@
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Strings become categories when distinct values are at most this share of rows
+CATEGORY_MAX_RATIO = 0.5
+CATEGORY_MAX_UNIQUE = 10_000
+# Values sniffed per string column before trying a full date parse
+DATE_SAMPLE_SIZE = 100
+DATE_PATTERN = re.compile(r'^\s*\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}([ T]\d{1,2}:\d{2}(:\d{2}(\.\d+)?)?)?\s*$')
+
+# Narrower integers overflow silently (or raise, when Arrow-backed) in the
+# arithmetic generated code does, so int32 is the floor, and only on request
+INT_CANDIDATES = [np.int32]
+
+
+def _is_arrow(dtype):
+    return pa is not None and isinstance(dtype, pd.ArrowDtype)
+
+
+def _with_backend(dtype, numpy_type):
+    """numpy_type in the same backend (NumPy or Arrow) as dtype."""
+    if _is_arrow(dtype):
+        return pd.ArrowDtype(pa.from_numpy_dtype(np.dtype(numpy_type)))
+    return np.dtype(numpy_type)
+
+
+def _downcast_integer(series):
+    if series.dtype.itemsize <= 1 or series.count() == 0:
+        return None
+    low, high = series.min(), series.max()
+    for candidate in INT_CANDIDATES:
+        info = np.iinfo(candidate)
+        if np.dtype(candidate).itemsize < series.dtype.itemsize and info.min <= low and high <= info.max:
+            return series.astype(_with_backend(series.dtype, candidate))
+    return None
+
+
+def _downcast_float(series):
+    if series.dtype.itemsize <= 4:
+        return None
+    narrowed = series.astype(_with_backend(series.dtype, np.float32))
+    # Only keep float32 when every value survives the round trip exactly
+    original = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    restored = narrowed.to_numpy(dtype=np.float64, na_value=np.nan)
+    if np.array_equal(original, restored, equal_nan=True):
+        return narrowed
+    return None
+
+
+def _parse_dates(series):
+    sample = series.dropna().head(DATE_SAMPLE_SIZE).astype(str)
+    if sample.empty or not sample.map(lambda value: bool(DATE_PATTERN.match(value))).all():
+        return None
+    with warnings.catch_warnings():
+        # pandas warns when it falls back to per-element format inference
+        warnings.simplefilter('ignore', UserWarning)
+        parsed = pd.to_datetime(series, errors='coerce')
+    # Reject the conversion if any value would be lost
+    if parsed.isna().sum() != series.isna().sum():
+        return None
+    return parsed
+
+
+def _to_category(series):
+    rows = len(series)
+    if rows == 0:
+        return None
+    unique = series.nunique(dropna=True)
+    if unique > CATEGORY_MAX_UNIQUE or unique > rows * CATEGORY_MAX_RATIO:
+        return None
+    return series.astype('category')
+
+
+def _optimize_column(series, convert_strings, downcast_numeric):
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return None
+    kind = getattr(dtype, 'kind', None) or ''
+    if kind and kind in 'if' and (isinstance(dtype, np.dtype) or _is_arrow(dtype)):
+        if not downcast_numeric:
+            return None
+        return _downcast_integer(series) if kind == 'i' else _downcast_float(series)
+    if convert_strings and pd.api.types.is_string_dtype(dtype):
+        parsed = _parse_dates(series)
+        return parsed if parsed is not None else _to_category(series)
+    return None
+
+
+def optimize_dtypes(df, convert_strings=False, downcast_numeric=False):
+    """
+    Shrink a freshly loaded frame. With convert_strings, parse date-like
+    strings and turn low-cardinality strings into categories. With
+    downcast_numeric, narrow int64 to int32 and float64 to float32 where
+    lossless. Both are off by default: categories reject string arithmetic
+    and add unobserved groups, and narrower columns change the results of
+    arithmetic, so code written against the plain frame can break.
+
+    Returns (optimized_df, report) where report has deep memory before and
+    after and the dtype change of every converted column.
+    """
+    before = int(df.memory_usage(deep=True).sum())
+    columns = {}
+    changes = []
+
+    for name in df.columns:
+        series = df[name]
+        converted = _optimize_column(series, convert_strings, downcast_numeric)
+        if converted is None:
+            columns[name] = series
+            continue
+        columns[name] = converted
+        changes.append({"column": str(name), "from": str(series.dtype), "to": str(converted.dtype)})
+
+    optimized = pd.DataFrame(columns, index=df.index) if changes else df
+    after = int(optimized.memory_usage(deep=True).sum()) if changes else before
+    return optimized, {
+        "memory_before": before,
+        "memory_after": after,
+        "reduction": 1 - after / before if before else 0.0,
+        "changes": changes
+    }
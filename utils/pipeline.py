@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.dataset_store import derive_key
+from utils.preprocessing import fill_null_values, remove_null_rows, normalize_columns
+
+STEP_FUNCTIONS = {
+    "fill_null_values": fill_null_values,
+    "remove_null_rows": remove_null_rows,
+    "normalize_columns": normalize_columns,
+}
+# Intermediate frames kept across reruns and sessions
+MAX_CACHE_BYTES = int(os.getenv('PIPELINE_CACHE_MB', '512')) * 1024 * 1024
+
+_lock = threading.Lock()
+_results = OrderedDict()
+
+
+def validate_steps(steps):
+    for step in steps:
+        if step.get("step") not in STEP_FUNCTIONS:
+            raise ValueError(f"Unknown preprocessing step: {step.get('step')}")
+
+
+def step_keys(base_key, steps):
+    """Chained keys: each step's key covers its own params and every step before it."""
+    keys = []
+    key = base_key
+    for step in steps:
+        key = derive_key(key, step["step"], step.get("params"))
+        keys.append(key)
+    return keys
+
+
+def _cache_get(key):
+    with _lock:
+        entry = _results.get(key)
+        if entry is None:
+            return None
+        _results.move_to_end(key)
+        return entry[0]
+
+
+def _cache_put(key, df):
+    # Deep sizes, so string columns count for what they hold; measured once per entry
+    nbytes = int(df.memory_usage(deep=True).sum())
+    with _lock:
+        _results[key] = (df, nbytes)
+        _results.move_to_end(key)
+        total = sum(size for _, size in _results.values())
+        while total > MAX_CACHE_BYTES and len(_results) > 1:
+            _, (_, evicted) = _results.popitem(last=False)
+            total -= evicted
+
+
+def run_pipeline(df, base_key, steps, on_step=None):
+    """
+    Apply steps ({"step": name, "params": {...}}) in order to df.
+
+    Every intermediate result is cached under its chained step key, so
+    re-running a recipe resumes from the longest cached prefix: changing
+    only the last step recomputes only that step. Returns (result, report)
+    with one report entry per step. df is never modified.
+    """
+    validate_steps(steps)
+    keys = step_keys(base_key, steps)
+
+    # Find the longest prefix whose result is already cached
+    start = 0
+    current = df
+    for position in range(len(steps) - 1, -1, -1):
+        cached = _cache_get(keys[position])
+        if cached is not None:
+            start = position + 1
+            current = cached
+            break
+
+    report = []
+    for step, key in zip(steps[:start], keys[:start]):
+        # Earlier prefix results may have been evicted; only the row count is reported
+        with _lock:
+            cached = _results.get(key)
+        report.append({"step": step["step"], "params": step.get("params", {}), "key": key, "cached": True,
+                       "seconds": 0.0, "rows": len(cached[0]) if cached is not None else None})
+
+    for step, key in zip(steps[start:], keys[start:]):
+        started = time.perf_counter()
+        current = STEP_FUNCTIONS[step["step"]](current, **step.get("params", {}))
+        _cache_put(key, current)
+        entry = {"step": step["step"], "params": step.get("params", {}), "key": key, "cached": False,
+                 "seconds": time.perf_counter() - started, "rows": len(current)}
+        report.append(entry)
+        if on_step is not None:
+            on_step(entry)
+
+    return current, report
+
+
+def clear_pipeline_cache():
+    with _lock:
+        _results.clear()
@@ -1,25 +1,114 @@
+import warnings
+
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler, StandardScaler
-
-def fill_null_values(df, method='mean', columns=None):
-    """Fill null values in the DataFrame using specified method."""
-    df_copy = df.copy()
-    if columns is None:
-        columns = df.columns
-    
-    for col in columns:
-        if df[col].dtype.kind in 'iuf':  # numeric columns
-            if method == 'mean':
-                df_copy[col] = df[col].fillna(df[col].mean())
-            elif method == 'median':
-                df_copy[col] = df[col].fillna(df[col].median())
-            elif method == 'zero':
-                df_copy[col] = df[col].fillna(0)
-        else:  # non-numeric columns
-            df_copy[col] = df[col].fillna(df[col].mode()[0] if not df[col].mode().empty else 'Unknown')
-    
-    return df_copy
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+from utils.sketches import HyperLogLog
+
+
+def _float_block(df, columns, dtype=np.float64):
+    """
+    Copy columns into one column-major 2D array with NaN for nulls, so each
+    column of the result is a contiguous slice.
+    """
+    block = np.empty((len(df), len(columns)), dtype=dtype, order='F')
+    for position, col in enumerate(columns):
+        block[:, position] = df[col].to_numpy(dtype=dtype, na_value=np.nan)
+    return block
+
+
+def _numeric_fill_values(block, missing, method):
+    """Per-column fill values for a 2D float block, NaN for all-null columns."""
+    if method == 'zero':
+        return np.zeros(block.shape[1])
+    if method == 'mean':
+        counts = block.shape[0] - missing.sum(axis=0)
+        sums = np.sum(block, axis=0, where=~missing)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return sums / counts
+    if method == 'median':
+        with warnings.catch_warnings():
+            # All-NaN columns warn and yield NaN, which leaves them unfilled
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return np.nanmedian(block, axis=0)
+    raise ValueError(f"Unsupported fill method: {method}")
+
+
+def fill_null_values(df, method='mean', columns=None, inplace=False):
+    """
+    Fill null values in the DataFrame using specified method.
+
+    NumPy float columns are filled as one 2D block: the fill values come from
+    a single nan-aggregate and are written with one masked assignment. Other
+    numeric columns use one pandas aggregate, non-numeric columns one mode()
+    call. With inplace=True df is modified and returned without copying.
+    """
+    subset = df if columns is None else df[list(columns)]
+    # Only columns that actually have nulls need a fill value
+    null_columns = subset.columns[subset.isna().any().to_numpy()]
+
+    float_cols = [col for col in null_columns
+                  if isinstance(df[col].dtype, np.dtype) and df[col].dtype.kind == 'f']
+    numeric_cols = [col for col in null_columns if df[col].dtype.kind in 'iuf' and col not in float_cols]
+    other_cols = [col for col in null_columns if df[col].dtype.kind not in 'iuf']
+
+    filled = {}
+    if float_cols:
+        block = _float_block(df, float_cols)
+        missing = np.isnan(block)
+        fills = _numeric_fill_values(block, missing, method)
+        np.copyto(block, np.broadcast_to(fills, block.shape), where=missing)
+        filled = {
+            col: block[:, position].astype(df[col].dtype, copy=False)
+            for position, col in enumerate(float_cols)
+        }
+
+    fill_values = {}
+    if numeric_cols:
+        # Arrow-backed or nullable numeric columns
+        if method == 'mean':
+            fill_values.update(df[numeric_cols].mean().to_dict())
+        elif method == 'median':
+            fill_values.update(df[numeric_cols].median().to_dict())
+        elif method == 'zero':
+            fill_values.update(dict.fromkeys(numeric_cols, 0))
+        # Integer columns cannot hold a fractional mean/median
+        for col in numeric_cols:
+            if df[col].dtype.kind in 'iu' and pd.notna(fill_values.get(col)):
+                fill_values[col] = round(fill_values[col])
+    if other_cols:
+        modes = df[other_cols].mode(dropna=True)
+        for col in other_cols:
+            value = modes[col].iloc[0] if len(modes) else None
+            fill_values[col] = value if pd.notna(value) else 'Unknown'
+    # All-null numeric columns have no mean/median to fill with
+    fill_values = {col: value for col, value in fill_values.items() if pd.notna(value)}
+
+    for col, value in fill_values.items():
+        filled[col] = _fill_column(df[col], value)
+
+    if inplace:
+        for col, values in filled.items():
+            df[col] = values
+        return df
+
+    result = {col: filled.get(col, df[col]) for col in df.columns}
+    # Unchanged columns are shared with df rather than copied
+    return pd.DataFrame(result, index=df.index, columns=df.columns, copy=False)
+
+
+def _fill_column(series, value):
+    if pa is not None and isinstance(series.dtype, pd.ArrowDtype) and pa.types.is_null(series.dtype.pyarrow_dtype):
+        # null[pyarrow] cannot hold any value; such columns are entirely empty
+        series = series.astype(object)
+    if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.dtype.categories:
+        series = series.cat.add_categories([value])
+    return series.fillna(value)
 
 def remove_null_rows(df, threshold=None):
     """Remove rows with null values based on threshold."""
@@ -27,31 +116,285 @@ def remove_null_rows(df, threshold=None):
         return df.dropna()
     return df.dropna(thresh=int((1 - threshold) * len(df.columns)))
 
-def normalize_columns(df, method='minmax', columns=None):
+class NormalizationTransform:
+    """
+    Column normalization fitted once over all selected columns.
+
+    fit() computes every column's parameters in one vectorized NumPy pass
+    (nan-aware, so nulls are ignored and stay null). The fitted transform can
+    then be applied to new batches with transform() or undone with
+    inverse_transform(). dtype=np.float32 halves the memory of the output.
+    """
+
+    METHODS = ('minmax', 'standard', 'log')
+
+    def __init__(self, method='minmax', columns=None, dtype=np.float64):
+        if method not in self.METHODS:
+            raise ValueError(f"Unsupported normalization method: {method}")
+        self.method = method
+        self.columns = None if columns is None else list(columns)
+        self.dtype = np.dtype(dtype)
+        self.offset_ = None
+        self.scale_ = None
+
+    def fit(self, df):
+        if self.columns is None:
+            self.columns = list(df.select_dtypes(include=[np.number]).columns)
+        # Non-numeric columns are skipped, as before
+        self.columns = [col for col in self.columns if df[col].dtype.kind in 'iuf']
+        # Parameters are always computed in float64 for accuracy
+        block = _float_block(df, self.columns)
+
+        with warnings.catch_warnings():
+            # All-null columns produce NaN parameters and stay null
+            warnings.simplefilter('ignore', RuntimeWarning)
+            if self.method == 'minmax':
+                offset = np.nanmin(block, axis=0)
+                scale = np.nanmax(block, axis=0) - offset
+            elif self.method == 'standard':
+                offset = np.nanmean(block, axis=0)
+                scale = np.nanstd(block, axis=0)
+            else:
+                # log1p(x - min + 1)
+                offset = np.nanmin(block, axis=0) - 1
+                scale = np.ones(len(self.columns))
+
+        # Constant columns map to 0 instead of dividing by zero
+        scale[scale == 0] = 1.0
+        self.offset_ = offset
+        self.scale_ = scale
+        return self
+
+    def _check_fitted(self):
+        if self.offset_ is None:
+            raise ValueError("NormalizationTransform must be fitted before use")
+
+    def _apply(self, df, block, inplace):
+        result = df if inplace else df.copy(deep=False)
+        for position, col in enumerate(self.columns):
+            result[col] = block[:, position]
+        return result
+
+    def transform(self, df, inplace=False):
+        self._check_fitted()
+        block = _float_block(df, self.columns, dtype=self.dtype)
+        block -= self.offset_.astype(self.dtype)
+        if self.method == 'log':
+            np.log1p(block, out=block)
+        else:
+            block /= self.scale_.astype(self.dtype)
+        return self._apply(df, block, inplace)
+
+    def fit_transform(self, df, inplace=False):
+        return self.fit(df).transform(df, inplace=inplace)
+
+    def inverse_transform(self, df, inplace=False):
+        self._check_fitted()
+        block = _float_block(df, self.columns, dtype=self.dtype)
+        if self.method == 'log':
+            np.expm1(block, out=block)
+        else:
+            block *= self.scale_.astype(self.dtype)
+        block += self.offset_.astype(self.dtype)
+        return self._apply(df, block, inplace)
+
+    def get_params(self):
+        """Fitted parameters per column, e.g. for display or persistence."""
+        self._check_fitted()
+        return {
+            col: {"offset": float(offset), "scale": float(scale)}
+            for col, offset, scale in zip(self.columns, self.offset_, self.scale_)
+        }
+
+
+def normalize_columns(df, method='minmax', columns=None, dtype=np.float64):
     """Normalize specified columns using the given method."""
-    df_copy = df.copy()
-    if columns is None:
-        columns = df.select_dtypes(include=[np.number]).columns
-    
-    for col in columns:
-        if df[col].dtype.kind in 'iuf':  # numeric columns
-            if method == 'minmax':
-                scaler = MinMaxScaler()
-                df_copy[col] = scaler.fit_transform(df[col].values.reshape(-1, 1))
-            elif method == 'standard':
-                scaler = StandardScaler()
-                df_copy[col] = scaler.fit_transform(df[col].values.reshape(-1, 1))
-            elif method == 'log':
-                df_copy[col] = np.log1p(df[col] - df[col].min() + 1)
-    
-    return df_copy
-
-def detect_patterns(df):
-    """Detect basic patterns in the data."""
+    return NormalizationTransform(method, columns, dtype=dtype).fit_transform(df)
+
+# Above this many cells detect_patterns(mode='auto') switches to approximate statistics
+EXACT_PATTERN_MAX_CELLS = 5_000_000
+PATTERN_SAMPLE_ROWS = 100_000
+MAX_CORRELATION_COLUMNS = 50
+TOP_CORRELATIONS = 10
+CONFIDENCE_Z = 1.96
+# Rows used to pick which columns enter a capped correlation matrix
+SCREENING_ROWS = 2_000
+# Above this many values HyperLogLog would take too long; unique counts come from the sample
+HLL_MAX_VALUES = 10_000_000
+UNIQUE_SAMPLE_ROWS = 20_000
+
+
+def _numeric_columns(df):
+    """Numeric (non-boolean) column labels, without copying like select_dtypes does."""
+    return [col for col, dtype in df.dtypes.items()
+            if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)]
+
+
+def _pairwise_correlation(block):
+    """
+    Pairwise-complete Pearson correlation of a 2D float block (NaN = null),
+    as DataFrame.corr() computes it, via masked matrix products.
+    Returns (corr, counts) where counts[i, j] is the rows used for the pair.
+    """
+    missing = np.isnan(block)
+    valid = (~missing).astype(np.float64)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        # Centering first keeps the sums of squares well conditioned
+        centered = np.where(missing, 0.0, block - np.nanmean(block, axis=0))
+    counts = valid.T @ valid
+    sums = centered.T @ valid
+    square_sums = (centered * centered).T @ valid
+    cross_sums = centered.T @ centered
+    covariance = counts * cross_sums - sums * sums.T
+    variance = counts * square_sums - sums * sums
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = covariance / np.sqrt(variance * variance.T)
+    corr[counts < 2] = np.nan
+    return np.clip(corr, -1.0, 1.0), counts
+
+
+def _correlation_intervals(corr, counts, z=CONFIDENCE_Z):
+    """95% confidence bounds for Pearson r via the Fisher z-transform."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fisher = np.arctanh(np.clip(corr, -0.999999, 0.999999))
+        half_width = z / np.sqrt(counts - 3)
+    return np.tanh(fisher - half_width), np.tanh(fisher + half_width)
+
+
+def _top_correlations(corr, lower, upper, counts, k=TOP_CORRELATIONS):
+    columns = corr.columns
+    values = corr.to_numpy()
+    rows, cols = np.triu_indices(len(columns), k=1)
+    strengths = np.abs(values[rows, cols])
+    order = [i for i in np.argsort(-np.nan_to_num(strengths, nan=-1.0)) if not np.isnan(strengths[i])][:k]
+    return [
+        {"x": columns[rows[i]], "y": columns[cols[i]], "r": float(values[rows[i], cols[i]]),
+         "ci_low": float(lower[rows[i], cols[i]]), "ci_high": float(upper[rows[i], cols[i]]),
+         "n": int(counts[rows[i], cols[i]])}
+        for i in order
+    ]
+
+
+def _estimate_unique(sample_values, total_rows):
+    """
+    Distinct-value estimate from a uniform sample (Haas & Stokes hybrid).
+    A chi-square test on the sample frequencies picks the unsmoothed
+    jackknife for evenly spread values, or Shlosser's estimator for skewed ones.
+    """
+    counts = sample_values.head(UNIQUE_SAMPLE_ROWS).value_counts(dropna=True, sort=False).to_numpy()
+    sampled = int(counts.sum())
+    distinct = len(counts)
+    if distinct <= 1:
+        return distinct
+    # Scale to the number of non-null rows the sample stands for
+    population = total_rows * sampled / min(len(sample_values), UNIQUE_SAMPLE_ROWS)
+    fraction = sampled / population
+    singletons = int((counts == 1).sum())
+
+    expected = sampled / distinct
+    chi_square = np.sum((counts - expected) ** 2) / expected
+    critical = (distinct - 1) + CONFIDENCE_Z * np.sqrt(2 * (distinct - 1))
+    if chi_square <= critical:
+        estimate = distinct / (1 - (1 - fraction) * singletons / sampled)
+    else:
+        frequencies = np.bincount(counts)
+        times_seen = np.arange(len(frequencies))
+        numerator = np.sum((1 - fraction) ** times_seen * frequencies)
+        denominator = np.sum(times_seen * fraction * (1 - fraction) ** (times_seen - 1) * frequencies)
+        estimate = distinct + singletons * numerator / denominator if denominator > 0 else distinct
+    return int(min(round(estimate), population))
+
+
+def _approximate_unique_counts(df, sample):
+    if df.size <= HLL_MAX_VALUES:
+        counts = {}
+        for col in df.columns:
+            sketch = HyperLogLog()
+            sketch.add(df[col])
+            counts[col] = sketch.estimate()
+    else:
+        # Too large to hash every value within the time budget
+        counts = {col: _estimate_unique(sample[col], len(df)) for col in df.columns}
+    return pd.Series(counts, dtype=np.int64)
+
+
+def _correlation_columns(sample, max_columns):
+    """
+    At most max_columns numeric columns. When there are more, keep the ones
+    most strongly correlated with anything, judged on a small sub-sample.
+    """
+    numeric = _numeric_columns(sample)
+    if len(numeric) <= max_columns:
+        return numeric
+    screen, _ = _pairwise_correlation(_float_block(sample.head(SCREENING_ROWS), numeric))
+    screen = np.abs(screen)
+    np.fill_diagonal(screen, np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        strength = np.nan_to_num(np.nanmax(screen, axis=0), nan=0.0)
+    keep = np.sort(np.argsort(-strength, kind='stable')[:max_columns])
+    return [numeric[position] for position in keep]
+
+
+def _approximate_patterns(df, sample_rows, max_correlation_columns):
+    # A uniform random sample without replacement; df is in memory, so this
+    # equals reservoir sampling. Sorted positions keep the gather cache-friendly
+    if len(df) > sample_rows:
+        positions = np.random.default_rng(0).choice(len(df), size=sample_rows, replace=False, shuffle=False)
+        sample = df.take(np.sort(positions))
+    else:
+        sample = df
+
+    numeric_count = len(_numeric_columns(df))
+    columns = _correlation_columns(sample, max_correlation_columns)
+    values, counts = _pairwise_correlation(_float_block(sample, columns))
+    corr = pd.DataFrame(values, index=columns, columns=columns)
+    lower, upper = _correlation_intervals(values, counts)
+
+    return {
+        'missing_percentages': sample.isnull().mean() * 100,
+        'unique_counts': _approximate_unique_counts(df, sample),
+        'data_types': df.dtypes,
+        'numeric_correlations': corr,
+        'mode': 'approximate',
+        'sample_rows': len(sample),
+        'correlation_columns_omitted': numeric_count - len(columns),
+        'top_correlations': _top_correlations(corr, lower, upper, counts)
+    }
+
+
+def detect_patterns(df, mode='auto', sample_rows=PATTERN_SAMPLE_ROWS,
+                    max_correlation_columns=MAX_CORRELATION_COLUMNS):
+    """
+    Detect basic patterns in the data.
+
+    mode='exact' computes exact statistics over every row. mode='approximate'
+    works from a uniform row sample: missing percentages and a correlation
+    matrix over at most max_correlation_columns numeric columns, with Fisher-z
+    95% bounds for the strongest pairs. Unique counts use HyperLogLog, or a
+    sample-based estimate for very large frames. mode='auto' picks exact for
+    small frames.
+    """
+    if mode == 'auto':
+        mode = 'exact' if df.size <= EXACT_PATTERN_MAX_CELLS else 'approximate'
+    if mode == 'approximate':
+        return _approximate_patterns(df, sample_rows, max_correlation_columns)
+    if mode != 'exact':
+        raise ValueError(f"Unsupported pattern mode: {mode}")
+
+    columns = _numeric_columns(df)
+    values, counts = _pairwise_correlation(_float_block(df, columns))
+    corr = pd.DataFrame(values, index=columns, columns=columns)
+    lower, upper = _correlation_intervals(values, counts)
     patterns = {
         'missing_percentages': df.isnull().mean() * 100,
         'unique_counts': df.nunique(),
         'data_types': df.dtypes,
-        'numeric_correlations': df.select_dtypes(include=[np.number]).corr()
+        'numeric_correlations': corr,
+        'mode': 'exact',
+        'sample_rows': len(df),
+        'correlation_columns_omitted': 0,
+        'top_correlations': _top_correlations(corr, lower, upper, counts)
     }
     return patterns
@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.dataset_store import derive_key
+from utils.figure_cache import cached_plot
+from utils.visualization import suggest_plots
+
+# Wall-clock budget for rendering one dataset's suggestions in the background
+BUDGET_SECONDS = float(os.getenv('PRERENDER_BUDGET_SECONDS', '20'))
+MAX_WORKERS = int(os.getenv('PRERENDER_WORKERS', '1'))
+# Jobs remembered per process, most recent datasets first
+MAX_JOBS = 16
+
+_lock = threading.Lock()
+_executor = None
+_jobs = OrderedDict()
+
+
+class PrerenderJob:
+    """Suggestions for one dataset version and the thumbnails rendered so far."""
+
+    def __init__(self, dataset_key):
+        self.dataset_key = dataset_key
+        self.suggestions = None
+        self.plots = {}
+        self.errors = {}
+        self.done = False
+        self.seconds = 0.0
+
+    def pending(self):
+        """Indices of suggestions that have neither a plot nor an error yet."""
+        if self.suggestions is None:
+            return []
+        return [i for i in range(len(self.suggestions)) if i not in self.plots and i not in self.errors]
+
+
+def plot_suggestion(df, suggestion, dataset_key, thumbnail=False):
+    """Render one suggestion through the figure cache."""
+    if suggestion['type'] == 'heatmap':
+        # Suggested heatmaps show the correlation of the numeric columns; keyed
+        # by the dataset version so the cache never hashes the matrix
+        return cached_plot('heatmap', df[suggestion['columns']].corr(), title=suggestion['description'],
+                           dataset_key=derive_key(dataset_key, 'corr', {'columns': suggestion['columns']}),
+                           thumbnail=thumbnail)
+    return cached_plot(suggestion['type'], df, x=suggestion.get('x'), y=suggestion.get('y'),
+                       title=suggestion['description'], dataset_key=dataset_key, thumbnail=thumbnail)
+
+
+def _run(job, df):
+    started = time.perf_counter()
+    try:
+        job.suggestions = suggest_plots(df)
+        for index, suggestion in enumerate(job.suggestions):
+            # Whatever is left over the budget is rendered on demand instead
+            if time.perf_counter() - started > BUDGET_SECONDS:
+                break
+            try:
+                job.plots[index] = plot_suggestion(df, suggestion, job.dataset_key, thumbnail=True)
+            except Exception as e:
+                job.errors[index] = str(e)
+    finally:
+        job.seconds = time.perf_counter() - started
+        job.done = True
+
+
+def start_prerender(df, dataset_key):
+    """
+    Compute plot suggestions for a dataset version and render their
+    thumbnails off the request path; full figures are built when opened.
+    Returns the job, which is shared by every session viewing the same
+    version; calling again for a known key just returns it.
+    """
+    global _executor
+    with _lock:
+        job = _jobs.get(dataset_key)
+        if job is not None:
+            _jobs.move_to_end(dataset_key)
+            return job
+        job = PrerenderJob(dataset_key)
+        _jobs[dataset_key] = job
+        while len(_jobs) > MAX_JOBS:
+            _jobs.popitem(last=False)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='prerender')
+    _executor.submit(_run, job, df)
+    return job
@@ -0,0 +1,80 @@
+import base64
+import io
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# Concurrent static renders across all sessions
+MAX_WORKERS = int(os.getenv('RENDER_WORKERS', str(min(os.cpu_count() or 1, 4))))
+DEFAULT_DPI = 300
+FACE_COLOR = '#0e1117'
+# Recent timings kept for get_render_stats()
+TIMING_HISTORY = 200
+
+_lock = threading.Lock()
+_executor = None
+_timings = deque(maxlen=TIMING_HISTORY)
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='render')
+        return _executor
+
+
+def _render(draw, figsize, dpi, submitted):
+    started = time.perf_counter()
+    # A private Figure on its own Agg canvas: no pyplot, no shared current figure
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    draw(fig, fig.add_subplot())
+    fig.tight_layout()
+    drawn = time.perf_counter()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight', dpi=dpi, facecolor=FACE_COLOR)
+    finished = time.perf_counter()
+    return base64.b64encode(buffer.getvalue()).decode(), {
+        'queue_seconds': started - submitted,
+        'draw_seconds': drawn - started,
+        'encode_seconds': finished - drawn,
+        'seconds': finished - submitted,
+        'png_bytes': buffer.tell()
+    }
+
+
+def render_png(draw, figsize=(10, 6), dpi=DEFAULT_DPI):
+    """
+    Render a static chart on the shared render pool.
+
+    draw(fig, ax) builds the chart on a Figure owned by this call only, so
+    renders from different sessions never touch each other's state.
+    Returns (base64 PNG, timings).
+    """
+    future = _get_executor().submit(_render, draw, figsize, dpi, time.perf_counter())
+    image, timings = future.result()
+    with _lock:
+        _timings.append(timings)
+    return image, timings
+
+
+def get_render_stats():
+    """Count and mean/p95 timings over the most recent renders."""
+    with _lock:
+        timings = list(_timings)
+    stats = {'renders': len(timings), 'workers': MAX_WORKERS}
+    for field in ('queue_seconds', 'draw_seconds', 'encode_seconds', 'seconds'):
+        values = np.array([entry[field] for entry in timings])
+        stats[field] = {
+            'mean': float(values.mean()) if len(values) else 0.0,
+            'p95': float(np.percentile(values, 95)) if len(values) else 0.0
+        }
+    return stats
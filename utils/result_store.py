@@ -0,0 +1,220 @@
+import base64
+import gzip
+import os
+import pickle
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.io as pio
+
+try:
+    from pyarrow.lib import ArrowException
+except ImportError:
+    ArrowException = ValueError
+
+STORE_DIR = os.getenv(
+    'RESULT_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'results')
+)
+# Results larger than this are written to disk and replaced by a preview
+INLINE_BYTES = int(os.getenv('RESULT_INLINE_KB', '256')) * 1024
+# Per session: inline results plus lazily loaded ones held in memory
+MEMORY_CAP_BYTES = int(os.getenv('RESULT_MEMORY_MB', '64')) * 1024 * 1024
+DISK_CAP_BYTES = int(os.getenv('RESULT_DISK_MB', '512')) * 1024 * 1024
+# Session directories untouched for this long are removed
+SESSION_TTL_SECONDS = float(os.getenv('RESULT_SESSION_TTL_HOURS', '24')) * 3600
+PREVIEW_ROWS = 20
+
+
+class StoredResult:
+    """Placeholder for a spilled result: a small preview plus where to load the rest."""
+
+    def __init__(self, ref, kind, path, nbytes, preview=None, shape=None, data=None):
+        self.ref = ref
+        self.kind = kind
+        self.path = path
+        self.nbytes = nbytes
+        self.preview = preview
+        self.shape = shape
+        # Summary table shown next to a spilled figure
+        self.data = data
+
+
+def _estimate_bytes(result):
+    if isinstance(result, pd.Series):
+        return int(result.memory_usage(deep=True))
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(deep=True).sum())
+    if isinstance(result, (str, bytes)):
+        return len(result)
+    if isinstance(result, dict) and 'figure' in result:
+        data = result.get('data')
+        return _estimate_bytes(result['figure']) + (_estimate_bytes(data) if data is not None else 0)
+    if hasattr(result, 'to_plotly_json'):
+        # Plotly figures keep their data arrays; never cheap enough to inline
+        return INLINE_BYTES + 1
+    return len(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _write_frame(path, frame):
+    """Parquet when the frame allows it, otherwise a gzipped pickle."""
+    as_series = isinstance(frame, pd.Series)
+    table = frame.to_frame() if as_series else frame
+    try:
+        table.to_parquet(f"{path}.parquet")
+        return f"{path}.parquet", 'series' if as_series else 'frame'
+    except (ValueError, TypeError, ImportError, ArrowException):
+        # Non-string column names, mixed object columns or types Parquet lacks (e.g. complex)
+        if os.path.exists(f"{path}.parquet"):
+            os.remove(f"{path}.parquet")
+        with gzip.open(f"{path}.pkl.gz", 'wb') as f:
+            pickle.dump(frame, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return f"{path}.pkl.gz", 'object'
+
+
+def _cleanup_stale_sessions():
+    now = time.time()
+    try:
+        names = os.listdir(STORE_DIR)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(STORE_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > SESSION_TTL_SECONDS:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            continue
+
+
+class ResultStore:
+    """
+    Per-session chat results with a memory cap. Small results stay inline;
+    large frames go to Parquet and figures to compressed files, leaving a
+    StoredResult preview in the message. Loaded results are kept in an LRU
+    within the cap, and when inline results alone exceed it the oldest turns
+    are spilled as well. The oldest files are dropped past the disk cap.
+    """
+
+    def __init__(self, session_id=None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.directory = os.path.join(STORE_DIR, self.session_id)
+        self._lock = threading.Lock()
+        self._loaded = OrderedDict()
+        self._files = OrderedDict()
+        self._stats = {"spilled": 0, "loads": 0, "expired": 0}
+        _cleanup_stale_sessions()
+
+    def _spill(self, result):
+        os.makedirs(self.directory, exist_ok=True)
+        ref = uuid.uuid4().hex[:12]
+        base = os.path.join(self.directory, ref)
+        nbytes = _estimate_bytes(result)
+
+        if isinstance(result, (pd.DataFrame, pd.Series)):
+            path, kind = _write_frame(base, result)
+            stored = StoredResult(ref, kind, path, nbytes, preview=result.head(PREVIEW_ROWS),
+                                  shape=result.shape)
+        elif isinstance(result, dict) and 'figure' in result:
+            figure = result['figure']
+            if isinstance(figure, str):
+                # PNG bytes are already compressed; only the base64 wrapper is dropped
+                path, kind = f"{base}.png", 'png'
+                with open(path, 'wb') as f:
+                    f.write(base64.b64decode(figure))
+            else:
+                path, kind = f"{base}.json.gz", 'plotly'
+                with gzip.open(path, 'wt', encoding='utf-8') as f:
+                    f.write(pio.to_json(figure))
+            data = result.get('data')
+            if data is not None and _estimate_bytes(data) > INLINE_BYTES:
+                data = data.head(PREVIEW_ROWS)
+            stored = StoredResult(ref, kind, path, nbytes, data=data)
+        else:
+            path, kind = f"{base}.pkl.gz", 'object'
+            with gzip.open(path, 'wb') as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            stored = StoredResult(ref, kind, path, nbytes)
+
+        self._files[ref] = path
+        self._stats["spilled"] += 1
+        self._enforce_disk_cap()
+        return stored
+
+    def _enforce_disk_cap(self):
+        sizes = {ref: os.path.getsize(path) for ref, path in self._files.items() if os.path.exists(path)}
+        total = sum(sizes.values())
+        while total > DISK_CAP_BYTES and len(self._files) > 1:
+            ref, path = self._files.popitem(last=False)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= sizes.get(ref, 0)
+            self._stats["expired"] += 1
+
+    def compact(self, result):
+        """Value to keep in the message: result itself if small, else a StoredResult."""
+        if result is None or _estimate_bytes(result) <= INLINE_BYTES:
+            return result
+        with self._lock:
+            return self._spill(result)
+
+    def load(self, stored):
+        """Full result behind a StoredResult, or None once its file has expired."""
+        with self._lock:
+            if stored.ref in self._loaded:
+                self._loaded.move_to_end(stored.ref)
+                return self._loaded[stored.ref][0]
+            if not os.path.exists(stored.path):
+                return None
+
+            if stored.kind in ('frame', 'series'):
+                result = pd.read_parquet(stored.path)
+                if stored.kind == 'series':
+                    result = result.iloc[:, 0]
+            elif stored.kind == 'png':
+                with open(stored.path, 'rb') as f:
+                    result = {'figure': base64.b64encode(f.read()).decode(), 'data': stored.data}
+            elif stored.kind == 'plotly':
+                with gzip.open(stored.path, 'rt', encoding='utf-8') as f:
+                    result = {'figure': pio.from_json(f.read()), 'data': stored.data}
+            else:
+                with gzip.open(stored.path, 'rb') as f:
+                    result = pickle.load(f)
+
+            self._stats["loads"] += 1
+            self._loaded[stored.ref] = (result, stored.nbytes)
+            return result
+
+    def enforce_memory_cap(self, messages):
+        """Drop loaded results, then spill the oldest inline ones, until under the cap."""
+        with self._lock:
+            inline = [(i, _estimate_bytes(m['result'])) for i, m in enumerate(messages)
+                      if m.get('result') is not None and not isinstance(m['result'], StoredResult)]
+            total = sum(size for _, size in inline) + sum(size for _, size in self._loaded.values())
+            while total > MEMORY_CAP_BYTES and self._loaded:
+                _, (_, size) = self._loaded.popitem(last=False)
+                total -= size
+            for index, size in inline:
+                if total <= MEMORY_CAP_BYTES:
+                    break
+                messages[index]['result'] = self._spill(messages[index]['result'])
+                total -= size
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["files"] = len(self._files)
+            stats["loaded_bytes"] = sum(size for _, size in self._loaded.values())
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._loaded.clear()
+            self._files.clear()
+            shutil.rmtree(self.directory, ignore_errors=True)
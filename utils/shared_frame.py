@@ -0,0 +1,169 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # pragma: no cover - very old Pythons
+    shared_memory = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Column buffers are aligned so NumPy views never straddle a cache line
+ALIGNMENT = 64
+# dtype kinds whose buffers can be shared byte-for-byte
+SHAREABLE_KINDS = 'biufcmM'
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _shareable_array(series):
+    """Return the NumPy buffer backing a column if it can live in shared memory."""
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in SHAREABLE_KINDS and not dtype.hasobject:
+        return np.ascontiguousarray(series.to_numpy(copy=False))
+    return None
+
+
+def _arrow_stream(series):
+    """Serialise an Arrow-backed column as an IPC stream that can be read back zero-copy."""
+    table = pa.Table.from_pandas(series.to_frame('values'), preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return np.frombuffer(sink.getvalue(), dtype=np.uint8)
+
+
+def is_available():
+    return shared_memory is not None
+
+
+class SharedFrame:
+    """
+    Owner side of a DataFrame placed in shared memory.
+
+    Fixed-width columns (numbers, booleans, datetimes and categorical codes)
+    and Arrow-backed columns (as IPC streams) are copied once into a single
+    shared block; anything else is pickled into the manifest. Workers rebuild the frame from the manifest with
+    attach_shared_frame without copying the shared columns.
+    """
+
+    def __init__(self, df):
+        columns = []
+        arrays = []
+        offset = 0
+
+        for position in range(df.shape[1]):
+            series = df.iloc[:, position]
+            entry = {}
+
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                data = np.ascontiguousarray(series.cat.codes.to_numpy())
+                entry.update({
+                    'kind': 'category',
+                    'categories': pickle.dumps(series.cat.categories),
+                    'ordered': series.cat.ordered
+                })
+            elif pa is not None and isinstance(series.dtype, pd.ArrowDtype):
+                data = _arrow_stream(series)
+                entry['kind'] = 'arrow'
+            else:
+                data = _shareable_array(series)
+                entry['kind'] = 'shared' if data is not None else 'pickle'
+
+            if data is None:
+                entry['values'] = pickle.dumps(series.array, protocol=pickle.HIGHEST_PROTOCOL)
+            else:
+                offset = _aligned(offset)
+                entry.update({'dtype': data.dtype.str, 'offset': offset, 'length': len(data)})
+                arrays.append((offset, data))
+                offset += data.nbytes
+
+            columns.append(entry)
+
+        self.nbytes = offset
+        # SharedMemory refuses zero-sized blocks
+        self._shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for start, data in arrays:
+            target = np.ndarray(data.shape, dtype=data.dtype, buffer=self._shm.buf, offset=start)
+            target[...] = data
+
+        if isinstance(df.index, pd.RangeIndex):
+            index = {'kind': 'range', 'start': df.index.start, 'stop': df.index.stop,
+                     'step': df.index.step, 'name': df.index.name}
+        else:
+            index = {'kind': 'pickle', 'values': pickle.dumps(df.index, protocol=pickle.HIGHEST_PROTOCOL)}
+
+        self.manifest = {
+            'shm_name': self._shm.name,
+            'columns': columns,
+            'column_labels': pickle.dumps(df.columns, protocol=pickle.HIGHEST_PROTOCOL),
+            'index': index
+        }
+
+    def close(self):
+        """Release the shared block. Attached workers keep their mapping."""
+        if self._shm is None:
+            return
+        try:
+            self._shm.close()
+            self._shm.unlink()
+        except (FileNotFoundError, OSError):
+            pass
+        self._shm = None
+
+
+def attach_shared_frame(manifest):
+    """
+    Rebuild a DataFrame from a SharedFrame manifest.
+
+    Shared columns are read-only views onto the owner's block. Callers should
+    enable pandas copy-on-write so that a snippet writing to a column copies
+    just that column. Returns (df, handle); keep handle alive while df is used.
+    """
+    shm = shared_memory.SharedMemory(name=manifest['shm_name'])
+    data = {}
+
+    for position, entry in enumerate(manifest['columns']):
+        if entry['kind'] == 'pickle':
+            data[position] = pickle.loads(entry['values'])
+            continue
+
+        values = np.ndarray(
+            (entry['length'],),
+            dtype=np.dtype(entry['dtype']),
+            buffer=shm.buf,
+            offset=entry['offset']
+        )
+        values.flags.writeable = False
+
+        if entry['kind'] == 'arrow':
+            # Arrow buffers point straight into the shared block
+            table = pa.ipc.open_stream(pa.py_buffer(values)).read_all()
+            values = pd.arrays.ArrowExtensionArray(table.column(0))
+        elif entry['kind'] == 'category':
+            values = pd.Categorical.from_codes(
+                values,
+                categories=pickle.loads(entry['categories']),
+                ordered=entry['ordered'],
+                validate=False
+            )
+        data[position] = values
+
+    index_info = manifest['index']
+    if index_info['kind'] == 'range':
+        index = pd.RangeIndex(index_info['start'], index_info['stop'], index_info['step'],
+                              name=index_info['name'])
+    else:
+        index = pickle.loads(index_info['values'])
+
+    # copy=False keeps one block per column, so copy-on-write stays per column
+    df = pd.DataFrame(data, index=index, copy=False)
+    df.columns = pickle.loads(manifest['column_labels'])
+    return df, shm
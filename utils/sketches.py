@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_PRECISION = 14
+
+
+def hash_values(values):
+    """64-bit hashes of a Series' values, NaN/None excluded."""
+    values = values.dropna()
+    return pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct-value sketch with 2**precision one-byte registers
+    (16 KB at the default precision, about 0.8% standard error).
+    Sketches with the same precision can be merged.
+    """
+
+    def __init__(self, precision=DEFAULT_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        if len(hashes) == 0:
+            return
+        rest_bits = 64 - self.precision
+        buckets = (hashes >> np.uint64(rest_bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << rest_bits) - 1)
+        # frexp's exponent is the bit length; exact since rest has fewer than 53 bits
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        ranks = (rest_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+
+    def add(self, values):
+        """Add the non-null values of a Series."""
+        self.add_hashes(hash_values(values))
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Linear counting is more accurate while many registers are still empty
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * np.log(m / zeros)))
+        return int(round(raw))
@@ -0,0 +1,160 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.dataframe_cache import new_digest
+from utils.sketches import HyperLogLog
+
+DEFAULT_CHUNK_ROWS = 250_000
+PREVIEW_ROWS = 5
+
+
+def _merge_dtype(current, new):
+    if current == new:
+        return current
+    if isinstance(current, np.dtype) and isinstance(new, np.dtype) and \
+       current.kind in 'iuf' and new.kind in 'iuf':
+        return np.result_type(current, new)
+    return np.dtype(object)
+
+
+class _HashingReader:
+    """Binary file wrapper that feeds every byte read into digest."""
+
+    def __init__(self, raw, digest):
+        self.raw = raw
+        self.digest = digest
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        self.digest.update(data)
+        return data
+
+    def drain(self):
+        # The parser may stop before EOF (e.g. a trailing newline it never asked for)
+        for block in iter(lambda: self.read(1024 * 1024), b''):
+            pass
+
+
+class StreamingProfile:
+    """
+    Dataset statistics accumulated one chunk at a time, in memory proportional
+    to the number of columns rather than rows: null counts, HyperLogLog
+    distinct counts and pairwise-complete sums for a Pearson correlation matrix.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.chunks = 0
+        self.columns = None
+        self.dtypes = {}
+        self.null_counts = None
+        self.sketches = {}
+        self.preview = None
+        self.numeric_columns = []
+        # Set by profile_csv_stream once the whole source has been read
+        self.content_hash = None
+        self._shift = None
+        self._pair_counts = None
+        self._sums = None
+        self._square_sums = None
+        self._cross_sums = None
+
+    def _start(self, chunk):
+        self.columns = list(chunk.columns)
+        self.null_counts = pd.Series(0, index=chunk.columns, dtype=np.int64)
+        self.sketches = {column: HyperLogLog() for column in self.columns}
+        self.preview = chunk.head(PREVIEW_ROWS)
+        self.numeric_columns = [column for column in self.columns if chunk[column].dtype.kind in 'iuf']
+
+        width = len(self.numeric_columns)
+        # Shifting by the first chunk's means keeps the running sums from
+        # cancelling catastrophically when values are large
+        self._shift = chunk[self.numeric_columns].mean().fillna(0).to_numpy(dtype=np.float64)
+        self._pair_counts = np.zeros((width, width))
+        self._sums = np.zeros((width, width))
+        self._square_sums = np.zeros((width, width))
+        self._cross_sums = np.zeros((width, width))
+
+    def update(self, chunk):
+        if self.columns is None:
+            self._start(chunk)
+
+        self.rows += len(chunk)
+        self.chunks += 1
+        self.null_counts = self.null_counts.add(chunk.isna().sum(), fill_value=0).astype(np.int64)
+        for column in self.columns:
+            dtype = chunk[column].dtype
+            self.dtypes[column] = _merge_dtype(self.dtypes.get(column, dtype), dtype)
+            values = chunk[column]
+            # A chunk with NaN turns an integer column into float64; hash one
+            # dtype so the same value lands in the same register either way
+            if dtype.kind in 'iuf':
+                values = values.astype(np.float64)
+            self.sketches[column].add(values)
+
+        if self.numeric_columns:
+            values = chunk[self.numeric_columns].apply(pd.to_numeric, errors='coerce') \
+                .to_numpy(dtype=np.float64, na_value=np.nan)
+            valid = ~np.isnan(values)
+            mask = valid.astype(np.float64)
+            centered = np.where(valid, values - self._shift, 0.0)
+            # Entry [i, j] only sums rows where both column i and column j are present
+            self._pair_counts += mask.T @ mask
+            self._sums += centered.T @ mask
+            self._square_sums += (centered * centered).T @ mask
+            self._cross_sums += centered.T @ centered
+
+    def dataset_info(self):
+        return {"rows": self.rows, "columns": len(self.columns or []), "chunks": self.chunks}
+
+    def correlations(self):
+        """Pairwise-complete Pearson correlation, matching DataFrame.corr()."""
+        n = self._pair_counts
+        sums = self._sums
+        covariance = n * self._cross_sums - sums * sums.T
+        variance = n * self._square_sums - sums * sums
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = covariance / np.sqrt(variance * variance.T)
+        corr[n < 2] = np.nan
+        corr = np.clip(corr, -1.0, 1.0)
+        return pd.DataFrame(corr, index=self.numeric_columns, columns=self.numeric_columns)
+
+    def patterns(self):
+        """Same keys as preprocessing.detect_patterns; unique counts are estimates."""
+        rows = max(self.rows, 1)
+        return {
+            'missing_percentages': self.null_counts / rows * 100,
+            'unique_counts': pd.Series({column: self.sketches[column].estimate() for column in self.columns},
+                                       dtype=np.int64),
+            'data_types': pd.Series(self.dtypes, dtype=object),
+            'numeric_correlations': self.correlations()
+        }
+
+
+def profile_csv_stream(source, chunk_rows=DEFAULT_CHUNK_ROWS, on_chunk=None):
+    """
+    Profile a CSV without materializing it. source may be a path or a file
+    object; on_chunk(profile), if given, is called after every chunk. The
+    source's content hash (as dataframe_cache.content_hash computes it) is
+    built while reading and left in profile.content_hash.
+    """
+    is_path = isinstance(source, (str, os.PathLike))
+    raw = open(source, 'rb') if is_path else source
+    try:
+        if hasattr(raw, 'seek'):
+            raw.seek(0)
+        reader_source = _HashingReader(raw, new_digest())
+        profile = StreamingProfile()
+        with pd.read_csv(reader_source, chunksize=chunk_rows) as reader:
+            for chunk in reader:
+                profile.update(chunk)
+                if on_chunk is not None:
+                    on_chunk(profile)
+        reader_source.drain()
+        profile.content_hash = reader_source.digest.hexdigest()
+    finally:
+        if is_path:
+            raw.close()
+    return profile
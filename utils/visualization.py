@@ -1,15 +1,97 @@
-import matplotlib.pyplot as plt
 import seaborn as sns
-import io
-import base64
+import time
 import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 
-def create_plot(plot_type, data, x=None, y=None, title=None, kind='line', figsize=(10, 6)):
-    """Create various types of plots based on the input parameters."""
-    
+from utils.downsampling import downsample_frame
+from utils.rendering import render_png
+
+# Render budget: points above these limits are reduced server-side before
+# a figure is serialized to the browser
+MAX_LINE_POINTS = 5_000
+MAX_SCATTER_POINTS = 20_000
+MAX_BOX_POINTS = 50_000
+MAX_BAR_CATEGORIES = 1_000
+DENSITY_BINS = 200
+# Thumbnails are shown a few hundred pixels wide, so they get far smaller budgets
+THUMBNAIL_LINE_POINTS = 500
+THUMBNAIL_SCATTER_POINTS = 1_000
+THUMBNAIL_BOX_POINTS = 0
+THUMBNAIL_DENSITY_BINS = 50
+THUMBNAIL_FIGSIZE = (4, 2.5)
+THUMBNAIL_DPI = 72
+
+
+def _render_stats(input_points, rendered_points, method, started, **extra):
+    return dict({
+        'input_points': int(input_points),
+        'rendered_points': int(rendered_points),
+        'points_reduced': int(max(input_points - rendered_points, 0)),
+        'method': method,
+        'seconds': time.perf_counter() - started
+    }, **extra)
+
+
+def _limit_categories(values):
+    """Keep the MAX_BAR_CATEGORIES largest bars, in their original order."""
+    if len(values) <= MAX_BAR_CATEGORIES:
+        return values
+    largest = values.abs().nlargest(MAX_BAR_CATEGORIES).index
+    return values[values.index.isin(largest)]
+
+
+def _density_figure(data, x, y, title, bins=DENSITY_BINS):
+    """Counts on a bins x bins grid instead of one marker per row."""
+    pairs = data[[x, y]].apply(pd.to_numeric, errors='coerce').dropna()
+    counts, x_edges, y_edges = np.histogram2d(
+        pairs[x].to_numpy(dtype=np.float64), pairs[y].to_numpy(dtype=np.float64), bins=bins
+    )
+    # Empty bins stay transparent
+    counts = np.where(counts > 0, counts, np.nan)
+    fig = go.Figure(go.Heatmap(
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=(y_edges[:-1] + y_edges[1:]) / 2,
+        z=counts.T,
+        colorscale='Viridis',
+        colorbar={'title': 'rows'}
+    ))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    return fig, int(np.count_nonzero(~np.isnan(counts)))
+
+
+def _box_from_stats(summary, x, y, title):
+    """Box plot drawn from precomputed quartiles; whiskers at 1.5 IQR, outliers omitted."""
+    iqr = summary['75%'] - summary['25%']
+    fig = go.Figure(go.Box(
+        x=summary.index.astype(str).tolist() if x else [y] * len(summary),
+        q1=summary['25%'], median=summary['50%'], q3=summary['75%'], mean=summary['mean'],
+        lowerfence=np.maximum(summary['min'], summary['25%'] - 1.5 * iqr),
+        upperfence=np.minimum(summary['max'], summary['75%'] + 1.5 * iqr),
+        name=y
+    ))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    return fig
+
+
+def create_plot(plot_type, data, x=None, y=None, title=None, kind='line', figsize=(10, 6), thumbnail=False):
+    """
+    Create various types of plots based on the input parameters.
+
+    Interactive charts stay within a render budget: bars are aggregated,
+    long lines are LTTB-downsampled, dense scatters become binned density
+    and large box plots are drawn from quartiles. The returned 'render_stats'
+    reports how many points were reduced. With thumbnail, the budgets are
+    the THUMBNAIL_* ones and static charts are drawn small at low DPI.
+    """
+    started = time.perf_counter()
+    line_points = THUMBNAIL_LINE_POINTS if thumbnail else MAX_LINE_POINTS
+    scatter_points = THUMBNAIL_SCATTER_POINTS if thumbnail else MAX_SCATTER_POINTS
+    box_points = THUMBNAIL_BOX_POINTS if thumbnail else MAX_BOX_POINTS
+    density_bins = THUMBNAIL_DENSITY_BINS if thumbnail else DENSITY_BINS
+    png_options = {'figsize': THUMBNAIL_FIGSIZE, 'dpi': THUMBNAIL_DPI} if thumbnail else {'figsize': figsize}
+
     if plot_type == 'pie':
         # Handle value_counts() for pie charts
         if isinstance(data, pd.Series):
@@ -31,83 +113,111 @@ def create_plot(plot_type, data, x=None, y=None, title=None, kind='line', figsiz
         
         return {
             "figure": fig,
-            "data": plot_data
+            "data": plot_data,
+            "render_stats": _render_stats(len(plot_data), len(plot_data), None, started)
         }
     
     elif plot_type == 'bar':
         if y:
-            fig = px.bar(data, x=x, y=y, title=title or f'{y} by {x}')
+            # One bar per category; plotly would otherwise stack one segment per row
+            totals = _limit_categories(data.groupby(x, observed=True, sort=False)[y].sum())
+            fig = px.bar(x=totals.index, y=totals.values, title=title or f'{y} by {x}',
+                         labels={'x': x, 'y': y})
             summary_data = data.groupby(x)[y].mean().reset_index()
         else:
             value_counts = data[x].value_counts()
+            totals = _limit_categories(value_counts)
             fig = px.bar(
-                x=value_counts.index,
-                y=value_counts.values,
+                x=totals.index,
+                y=totals.values,
                 title=title or f'Distribution of {x}'
             )
             summary_data = value_counts.reset_index().rename(columns={'index': x, x: 'count'})
         
         return {
             'figure': fig,
-            'data': summary_data
+            'data': summary_data,
+            'render_stats': _render_stats(len(data), len(totals), 'aggregate', started)
         }
     
     elif plot_type == 'scatter':
-        fig = px.scatter(data, x=x, y=y, title=title or f'{y} vs {x}')
+        title = title or f'{y} vs {x}'
+        method = None
+        if len(data) <= scatter_points:
+            fig = px.scatter(data, x=x, y=y, title=title)
+            rendered = len(data)
+        elif pd.api.types.is_numeric_dtype(data[x]) and pd.api.types.is_numeric_dtype(data[y]):
+            fig, rendered = _density_figure(data, x, y, title, bins=density_bins)
+            method = 'density'
+        else:
+            fig = px.scatter(data.sample(scatter_points, random_state=0), x=x, y=y, title=title)
+            rendered = scatter_points
+            method = 'sample'
         return {
             'figure': fig,
-            'data': data[[x, y]].describe()
+            'data': data[[x, y]].describe(),
+            'render_stats': _render_stats(len(data), rendered, method, started)
         }
     
     elif plot_type == 'line':
-        fig = px.line(data, x=x, y=y, title=title or f'{y} over {x}')
+        y_columns = y if isinstance(y, list) else [y]
+        plot_data = downsample_frame(data, x, y_columns, line_points)
+        fig = px.line(plot_data, x=x, y=y, title=title or f'{y} over {x or "index"}')
         return {
             'figure': fig,
-            'data': data[[x, y]].head(10)
+            'data': data[[column for column in [x, *y_columns] if column is not None]].head(10),
+            'render_stats': _render_stats(len(data), len(plot_data),
+                                          'lttb' if len(plot_data) < len(data) else None, started)
         }
     
     elif plot_type == 'box':
-        fig = px.box(data, x=x, y=y, title=title or f'Box Plot of {y} by {x}')
+        if x is None:
+            summary = data[[y]].describe().T
+            title = title or f'Box Plot of {y}'
+        else:
+            summary = data.groupby(x, observed=True)[y].describe()
+            title = title or f'Box Plot of {y} by {x}'
+        if len(data) <= box_points:
+            fig = px.box(data, x=x, y=y, title=title)
+            rendered, method = len(data), None
+        else:
+            fig = _box_from_stats(summary, x, y, title)
+            rendered, method = len(summary) * 5, 'quartiles'
         return {
             'figure': fig,
-            'data': data.groupby(x)[y].describe().reset_index()
+            'data': summary.reset_index(),
+            'render_stats': _render_stats(len(data), rendered, method, started)
         }
     
     elif plot_type == 'histogram':
-        plt.hist(data[x], bins=30)
-        plt.title(title or f'Distribution of {x}')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png', bbox_inches='tight', dpi=300, facecolor='#0e1117')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
-        
+        values = pd.to_numeric(data[x], errors='coerce').dropna().to_numpy(dtype=np.float64)
+
+        def draw(fig, ax):
+            ax.hist(values, bins=30)
+            ax.set_title(title or f'Distribution of {x}')
+            ax.tick_params(axis='x', labelrotation=45)
+
+        image_base64, timings = render_png(draw, **png_options)
         return {
             'figure': image_base64,
-            'data': data[x].describe()
+            'data': data[x].describe(),
+            'render_stats': _render_stats(len(data), 30, 'bins', started, render=timings)
         }
     
     elif plot_type == 'heatmap':
-        if isinstance(data, (pd.DataFrame, np.ndarray)):
-            sns.heatmap(data, annot=True, cmap='coolwarm')
-        else:
-            sns.heatmap(data.corr(), annot=True, cmap='coolwarm')
-        plt.title(title or 'Correlation Heatmap')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png', bbox_inches='tight', dpi=300, facecolor='#0e1117')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
-        
+        matrix = data if isinstance(data, (pd.DataFrame, np.ndarray)) else data.corr()
+
+        def draw(fig, ax):
+            # Cell labels are unreadable at thumbnail size
+            sns.heatmap(matrix, annot=not thumbnail, cmap='coolwarm', ax=ax)
+            ax.set_title(title or 'Correlation Heatmap')
+            ax.tick_params(axis='x', labelrotation=45)
+
+        image_base64, timings = render_png(draw, **png_options)
         return {
             'figure': image_base64,
-            'data': data.corr()
+            'data': data.corr(),
+            'render_stats': _render_stats(np.size(matrix), np.size(matrix), None, started, render=timings)
         }
     
     else:
@@ -115,11 +225,15 @@ def create_plot(plot_type, data, x=None, y=None, title=None, kind='line', figsiz
 
 def get_numeric_columns(df):
     """Get list of numeric columns from dataframe."""
-    return df.select_dtypes(include=['int64', 'float64']).columns.tolist()
+    # np.number also matches narrower and Arrow-backed numeric dtypes
+    return df.select_dtypes(include=[np.number]).columns.tolist()
 
 def get_categorical_columns(df):
     """Get list of categorical columns from dataframe."""
-    return df.select_dtypes(include=['object', 'category']).columns.tolist()
+    return [
+        col for col, dtype in df.dtypes.items()
+        if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(dtype)
+    ]
 
 def suggest_plots(df):
     """Suggest suitable plots based on data types."""
@@ -139,7 +253,8 @@ def suggest_plots(df):
         suggestions.append({
             'type': 'line',
             'description': f"Show trend line for {numeric_cols[0]}",
-            'x': df.index.name or 'index',
+            # None plots against the index, whatever it is named
+            'x': None,
             'y': numeric_cols[0]
         })
     
@@ -153,7 +268,8 @@ def suggest_plots(df):
         suggestions.append({
             'type': 'box',
             'description': f"Show boxplot for {numeric_cols[0]}",
-            'x': numeric_cols[0]
+            'x': categorical_cols[0] if categorical_cols else None,
+            'y': numeric_cols[0]
         })
     
     if len(categorical_cols) > 0:
@@ -172,7 +288,8 @@ def suggest_plots(df):
     if len(numeric_cols) > 3:
         suggestions.append({
             'type': 'heatmap',
-            'description': "Show correlation heatmap for numeric columns"
+            'description': "Show correlation heatmap for numeric columns",
+            'columns': numeric_cols
         })
     
     return suggestions